@@ -6,7 +6,8 @@ maa.py — SLCM Attendance automation (complete file)
 Includes:
  - quick-precheck to avoid unnecessary month prev/next navigation
  - collect_candidates() computing top relative to calendar wrapper
- - click_fragment() which records window.__slcm_last_clicked_date
+ - click_and_verify() which records window.__slcm_last_clicked_date and
+   checks the opened panel in the same call
  - robust panel_opened_ok() detection
  - multi-step fallback when calendar navigation fails
 """
@@ -20,22 +21,41 @@ import shutil
 import re
 import unicodedata
 import calendar
-import pandas as pd
-from datetime import datetime, date
-
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import (
-    StaleElementReferenceException,
-    TimeoutException,
-    SessionNotCreatedException,
-)
+import atexit
+import socket
+import subprocess
+from pathlib import Path
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+from collections import namedtuple
+from dateutil.parser import parse as _du_parse
+
+# Selenium / webdriver-manager are imported lazily by load_selenium() so that
+# argument errors exit without paying their import cost.
+webdriver = Service = ChromeDriverManager = None
+By = WebDriverWait = EC = Keys = None
+StaleElementReferenceException = TimeoutException = SessionNotCreatedException = None
+
+def load_selenium():
+    global webdriver, Service, ChromeDriverManager, By, WebDriverWait, EC, Keys
+    global StaleElementReferenceException, TimeoutException, SessionNotCreatedException
+    if webdriver is not None:
+        return
+    from selenium import webdriver as _webdriver
+    from selenium.webdriver.chrome.service import Service as _Service
+    from webdriver_manager.chrome import ChromeDriverManager as _ChromeDriverManager
+
+    from selenium.webdriver.common.by import By as _By
+    from selenium.webdriver.support.ui import WebDriverWait as _WebDriverWait
+    from selenium.webdriver.support import expected_conditions as _EC
+    from selenium.webdriver.common.keys import Keys as _Keys
+    from selenium.common import exceptions as _exc
+
+    webdriver, Service, ChromeDriverManager = _webdriver, _Service, _ChromeDriverManager
+    By, WebDriverWait, EC, Keys = _By, _WebDriverWait, _EC, _Keys
+    StaleElementReferenceException = _exc.StaleElementReferenceException
+    TimeoutException = _exc.TimeoutException
+    SessionNotCreatedException = _exc.SessionNotCreatedException
 
 # -------- Tunables (you can tweak if needed) --------
 PANEL_READY_TIMEOUT    = 30
@@ -43,16 +63,45 @@ EVENT_SETTLE_TIMEOUT   = 25
 EVENT_SEARCH_TIMEOUT   = 45
 SCROLL_STEP_FRACTION   = 0.60
 SCROLL_PAUSE           = 0.30
-AFTER_DATE_CLICK_PAUSE = 1.0  # reduced for speed
+AFTER_DATE_CLICK_PAUSE = 1.0  # upper bound; ends as soon as the day panel renders
+NAV_READY_TIMEOUT      = 5
+DRIVER_PATH_MAX_AGE    = 7 * 86400  # seconds; re-resolve chromedriver at least weekly
 
 SHORT_FIND_TIMEOUT        = 2
 PER_STUDENT_MAX_SECONDS   = 5
 TABLE_SCROLL_TRIES        = 6
 TABLE_SCROLL_PAUSE        = 0.20
+TABLE_SWEEP_TIMEOUT       = 30    # one top-to-bottom pass over the attendance table for unrendered ids
+
+# Last-resort "nudge the sidebar month next/prev and retry" pass; off unless SLCM_NUDGE=1
+ENABLE_NUDGE = os.environ.get("SLCM_NUDGE", "0") == "1"
+
+# --attach (or SLCM_ATTACH=1): keep one Chrome running between runs and attach to it on this port
+ATTACH_PORT = 9222
 
 # Debugging for calendar nav
 DEBUG = False  # set False to reduce calendar debugging output
 
+# Precompiled patterns (hot paths)
+# inputs are already stripped, so no \s* padding; ASCII digits only
+_FLOAT_RE = re.compile(r"-?\d+(\.\d+)?$", re.ASCII)
+_STUDENT_ID_RE = re.compile(r"[A-Za-z0-9]{6,}$", re.ASCII)
+_MONTH_NAMES = ("January", "February", "March", "April", "May", "June", "July",
+                "August", "September", "October", "November", "December")
+_WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+_MONTH_RE = re.compile(r"\b(January|February|March|April|May|June|July|August|September|October|November|December|"
+                       r"Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)\b(?:[^0-9]{0,3}(\d{4}))?", re.I)
+
+# grouped by shape so only formats that can match the separators are tried
+_DATE_FMTS_YMD   = ("%Y-%m-%d",)
+_DATE_FMTS_DMY   = ("%d-%m-%Y", "%d-%m-%y")
+_DATE_FMTS_DBY   = ("%d-%b-%Y", "%d-%b-%y")
+_DATE_FMTS_SPACE = ("%d %b %Y", "%d %B %Y")
+_DATE_FMTS_LONG = (
+    "%A, %d %B %Y at %I:%M:%S %p",
+    "%A, %d %B %Y",
+)
+
 # =========================================================
 # SLCM URLs
 # =========================================================
@@ -63,66 +112,76 @@ LOGIN_URL = "https://maheslcm.manipal.edu/login"
 # =========================================================
 # CLI parsing (date, workbook path, absentees, subject details)
 # =========================================================
+def attach_requested():
+    return "--attach" in sys.argv[1:] or os.environ.get("SLCM_ATTACH", "0") == "1"
+
 def parse_arguments():
-    if len(sys.argv) < 5:
-        print("❌ Usage: python maa.py <date> <workbook_path> <absentees> <subject_details>")
+    args = [a for a in sys.argv[1:] if a != "--attach"]
+    attach = attach_requested()
+    if len(args) < 4:
+        print("❌ Usage: python maa.py [--attach] <date> <workbook_path> <absentees> <subject_details>")
+        print("         python maa.py [--attach] --daemon   (JSON requests on stdin)")
         sys.exit(1)
-    selected_date_str   = sys.argv[1]
-    workbook_path       = sys.argv[2]
-    absentees_str       = sys.argv[3]
-    subject_details_str = sys.argv[4]
-    return selected_date_str, workbook_path, absentees_str, subject_details_str
+    selected_date_str   = args[0]
+    workbook_path       = args[1]
+    absentees_str       = args[2]
+    subject_details_str = args[3]
+    return selected_date_str, workbook_path, absentees_str, subject_details_str, attach
 
 # =========================================================
 # Date parsing helpers
 # =========================================================
 def excel_serial_to_date(n):
     try:
-        n = float(n)
+        n_int = int(float(n))
     except Exception:
         return None
 
-    def from_base(base_year):
-        base = datetime(1899, 12, 30) if base_year == 1900 else datetime(1904, 1, 1)
-        return (base + pd.to_timedelta(int(n), unit="D")).date()
-
-    candidates = []
-    for base in (1900, 1904):
-        try:
-            d = from_base(base)
-            if 1990 <= d.year <= 2100:
-                candidates.append(d)
-        except Exception:
-            pass
-    if not candidates:
-        try:
-            return from_base(1900)
-        except Exception:
-            return None
-    today = date.today()
-    candidates.sort(key=lambda d: abs((d - today).days))
-    return candidates[0]
+    # Two possible epochs: 1900 (Windows Excel) and 1904 (old Mac Excel)
+    try:
+        d1900 = (datetime(1899, 12, 30) + timedelta(days=n_int)).date()
+    except (OverflowError, ValueError):
+        return None
+    try:
+        d1904 = (datetime(1904, 1, 1) + timedelta(days=n_int)).date()
+    except (OverflowError, ValueError):
+        d1904 = None
+
+    ok1900 = 1990 <= d1900.year <= 2100
+    ok1904 = d1904 is not None and 1990 <= d1904.year <= 2100
+    if ok1900 and ok1904:
+        today = date.today()
+        return d1900 if abs((d1900 - today).days) <= abs((d1904 - today).days) else d1904
+    if ok1904:
+        return d1904
+    return d1900
+
+# NFC is a no-op on ASCII (the usual CLI input), so skip the table walk
+def _nfc(s):
+    return s if s.isascii() else unicodedata.normalize("NFC", s)
 
 def parse_date_any(s):
     if s is None:
         return None
-    s = unicodedata.normalize("NFC", str(s)).strip()
+    return _parse_date_any_cached(_nfc(str(s)).strip())
+
+@lru_cache(maxsize=1024)
+def _parse_date_any_cached(s):
     if not s:
         return None
 
-    # Excel serial?
-    try:
-        as_float = float(s)
-        d = excel_serial_to_date(as_float)
+    # Excel serial? (only numeric strings reach float(); excel_serial_to_date never raises)
+    if _FLOAT_RE.match(s):
+        d = excel_serial_to_date(s)
         if d:
             if DEBUG: print(f"📅 Parsed Excel serial {s} -> {d}")
             return d
-    except Exception:
-        pass
 
-    m = re.fullmatch(r"\s*(\d{1,2})/(\d{1,2})/(\d{2,4})\s*", s)
-    if m:
-        m1, d1, y1 = int(m.group(1)), int(m.group(2)), int(m.group(3))
+    # M/D/Y (the usual CLI form) via split; same shape as \d{1,2}/\d{1,2}/\d{2,4}
+    parts = s.split("/") if "/" in s else ()
+    if (len(parts) == 3 and s.isascii() and all(p.isdigit() for p in parts)
+            and len(parts[0]) <= 2 and len(parts[1]) <= 2 and 2 <= len(parts[2]) <= 4):
+        m1, d1, y1 = int(parts[0]), int(parts[1]), int(parts[2])
         if y1 < 100:
             y1 += 2000 if y1 < 50 else 1900
         try:
@@ -137,14 +196,17 @@ def parse_date_any(s):
             except ValueError:
                 pass
 
-    fmts = [
-        "%Y-%m-%d",
-        "%d-%m-%Y", "%d-%m-%y",
-        "%d-%b-%Y", "%d-%b-%y",
-        "%d %b %Y", "%d %B %Y",
-        "%A, %d %B %Y at %I:%M:%S %p",
-        "%A, %d %B %Y",
-    ]
+    # Every format needs a '-' or ' ' and at least 6 chars; only the long ones contain ','
+    if len(s) < 6 or ("-" not in s and " " not in s):
+        fmts = ()
+    elif "," in s:
+        fmts = _DATE_FMTS_LONG if " at " in s else _DATE_FMTS_LONG[1:]
+    elif " " in s:
+        fmts = _DATE_FMTS_SPACE
+    elif s[4] == "-" and s[:4].isdigit():
+        fmts = _DATE_FMTS_YMD
+    else:
+        fmts = _DATE_FMTS_DBY if s.split("-")[1].isalpha() else _DATE_FMTS_DMY
     for f in fmts:
         try:
             parsed = datetime.strptime(s, f).date()
@@ -153,9 +215,14 @@ def parse_date_any(s):
         except Exception:
             continue
 
+    # dateutil is the slow path; without a digit it can only guess from today's date
+    if not any(c.isdigit() for c in s):
+        if DEBUG: print(f"❌ Could not parse date: {s}")
+        return None
     try:
-        parsed = pd.to_datetime(s, dayfirst=False).date()
-        if DEBUG: print(f"📅 Parsed '{s}' via pandas (dayfirst=False) -> {parsed}")
+        # missing fields default to the 1st / January (as pandas did), not to today's date
+        parsed = _du_parse(s, dayfirst=False, default=datetime(date.today().year, 1, 1)).date()
+        if DEBUG: print(f"📅 Parsed '{s}' via dateutil (dayfirst=False) -> {parsed}")
         return parsed
     except Exception:
         if DEBUG: print(f"❌ Could not parse date: {s}")
@@ -164,8 +231,9 @@ def parse_date_any(s):
 # =========================================================
 # Subject details parsing
 # =========================================================
+@lru_cache(maxsize=1024)
 def parse_subject_details(details):
-    raw = unicodedata.normalize("NFC", str(details or "")).strip()
+    raw = _nfc(str(details or "")).strip()
     if not raw:
         return None, "empty subject details"
     if "::" in raw:
@@ -173,7 +241,7 @@ def parse_subject_details(details):
     else:
         parts = raw.replace("^|", "|").split("|")
     parts += [""] * (5 - len(parts))
-    course_name, course_code, semester, class_section, session_no = [p.strip() for p in parts[:5]]
+    course_name, course_code, semester, class_section, session_no = (p.strip() for p in parts[:5])
 
     missing = []
     if not course_code:   missing.append("Course Code")
@@ -187,60 +255,150 @@ def parse_subject_details(details):
 # =========================================================
 # Selenium helpers
 # =========================================================
+# Registered once per document via CDP so hot calls only ship a short expression
+PAGE_HELPERS_JS = (
+    "window.__slcm = {"
+    "click: e => { e.scrollIntoView({block:'center'}); e.click(); },"
+    "ready: () => document.readyState === 'complete'"
+    "};"
+)
+
+def install_page_helpers(driver):
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": PAGE_HELPERS_JS})
+    except Exception:
+        pass
+    try:
+        driver.execute_script(PAGE_HELPERS_JS)
+    except Exception:
+        pass
+
 def js_click(driver, el):
+    try:
+        driver.execute_script("window.__slcm.click(arguments[0]);", el)
+        return
+    except StaleElementReferenceException:
+        raise
+    except Exception:
+        pass
     driver.execute_script("arguments[0].scrollIntoView({block:'center'});", el)
     driver.execute_script("arguments[0].click();", el)
 
+def cdp_query_all(driver, selector):
+    root = driver.execute_cdp_cmd("DOM.getDocument", {"depth": 0})["root"]["nodeId"]
+    return driver.execute_cdp_cmd("DOM.querySelectorAll", {"nodeId": root, "selector": selector})["nodeIds"]
+
 def ready(driver):
+    try:
+        return bool(driver.execute_script("return window.__slcm.ready();"))
+    except Exception:
+        pass
     try:
         return driver.execute_script("return document.readyState") == "complete"
     except Exception:
         return False
 
+BLANK_TAB_PREFIXES = ("about:blank","chrome://newtab","chrome://")
+
 def close_blank_tabs(driver):
-    handles = driver.window_handles[:]
-    for h in handles:
-        driver.switch_to.window(h)
-        url = driver.current_url
-        if url.startswith(("about:blank","chrome://newtab","chrome://")):
-            try: driver.close()
+    # CDP lists every tab's URL in one call; fall back to switching through handles
+    try:
+        targets = driver.execute_cdp_cmd("Target.getTargets", {})["targetInfos"]
+        for t in targets:
+            if t.get("type") == "page" and (t.get("url") or "").startswith(BLANK_TAB_PREFIXES):
+                try: driver.execute_cdp_cmd("Target.closeTarget", {"targetId": t["targetId"]})
+                except Exception: pass
+    except Exception:
+        to_close = []
+        for h in driver.window_handles:
+            driver.switch_to.window(h)
+            if driver.current_url.startswith(BLANK_TAB_PREFIXES):
+                to_close.append(h)
+        for h in to_close:
+            try:
+                driver.switch_to.window(h); driver.close()
             except Exception: pass
     if driver.window_handles:
         driver.switch_to.window(driver.window_handles[-1])
 
+# readyState and the URL scheme in one round-trip per poll
+def loaded_http(driver):
+    try:
+        return bool(driver.execute_script(
+            "return document.readyState === 'complete' && location.href.startsWith('http');"))
+    except Exception:
+        return ready(driver) and driver.current_url.startswith("http")
+
+def wait_loaded(driver, timeout=NAV_READY_TIMEOUT):
+    WebDriverWait(driver, timeout, poll_frequency=0.05).until(loaded_http)
+    return True
+
 def hard_nav(driver, url, attempts=4):
-    for _ in range(attempts):
+    for attempt_idx in range(attempts):
         try:
-            driver.get(url); time.sleep(0.5)
-            if ready(driver) and driver.current_url.startswith("http"): return True
+            driver.get(url)
+            return wait_loaded(driver)
         except Exception: pass
         try:
-            driver.execute_script("window.location.href = arguments[0];", url); time.sleep(0.5)
-            if ready(driver) and driver.current_url.startswith("http"): return True
+            driver.execute_script("window.location.href = arguments[0];", url)
+            return wait_loaded(driver)
         except Exception: pass
         try:
-            driver.switch_to.new_window('tab'); driver.get(url); time.sleep(0.7)
-            if ready(driver) and driver.current_url.startswith("http"):
-                close_blank_tabs(driver); return True
+            driver.switch_to.new_window('tab'); driver.get(url)
+            wait_loaded(driver)
+            close_blank_tabs(driver); return True
         except Exception: pass
-        time.sleep(0.3)
+        if attempt_idx < attempts - 1:
+            time.sleep(min(0.1 * 2 ** attempt_idx, 1.0))
     close_blank_tabs(driver); return False
 
 # =========================================================
 # Mini-calendar helpers
 # =========================================================
-def _sidebar_month_label(driver):
-    js = """
-    const wrap = document.querySelector('#calendarSidebar') || document.querySelector('.calendarSidebar') || document.getElementById('calendarSidebar');
-    if (!wrap) return null;
-    const all = wrap.querySelectorAll('*');
-    const texts = [];
-    for (const el of all) {
-      const txt = (el.innerText || el.textContent || '').trim();
-      if (txt) texts.push(txt);
+# Prepended to sidebar snippets: resolves #calendarSidebar once and reuses it while attached
+SIDEBAR_WRAP_JS = """
+function __slcm_wrap() {
+  let w = window.__slcm_wrap;
+  if (w && w.isConnected) return w;
+  w = document.getElementById('calendarSidebar') || document.querySelector('.calendarSidebar');
+  window.__slcm_wrap = w;
+  return w;
+}
+"""
+
+# Probe the usual month-header nodes first; the full descendant walk is only a fallback.
+# The label is memoized on the page until the next prev/next click bumps __slcm_nav_seq
+# (or the header node it came from is replaced or re-rendered with new text).
+SIDEBAR_LABEL_JS = """
+function __slcm_month_label() {
+  const seq = window.__slcm_nav_seq || 0;
+  const memo = window.__slcm_label;
+  if (memo && memo.seq === seq && memo.node.isConnected && memo.node.textContent === memo.txt) return memo.label;
+  const wrap = __slcm_wrap();
+  if (!wrap) return null;
+  const keep = (node, label) => { window.__slcm_label = {seq, node, txt: node.textContent, label}; return label; };
+  const MONTH_RE = /\\b(January|February|March|April|May|June|July|August|September|October|November|December|Jan|Feb|Mar|Apr|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)\\b/i;
+  const head = wrap.querySelector('.slds-datepicker__filter_month h2, .slds-datepicker__filter, [class*="monthYear"], .ui-datepicker-title, h2, header');
+  if (head) {
+    const txt = (head.textContent || '').replace(/\\s+/g, ' ').trim();
+    const m = txt.match(MONTH_RE);
+    if (m) {
+      const sel = wrap.querySelector('select');
+      if (sel && /^\\d{4}$/.test(sel.value || '')) return keep(head, m[1] + ' ' + sel.value);
+      const y = txt.slice(m.index + m[1].length).match(/^[^0-9]{0,3}(\\d{4})/);
+      return keep(head, y ? m[1] + ' ' + y[1] : m[1]);
     }
-    return texts.join(" || ");
-    """
+  }
+  for (const el of wrap.querySelectorAll('*')) {
+    const txt = (el.textContent || '').replace(/\\s+/g, ' ').trim();
+    if (txt && MONTH_RE.test(txt)) return keep(el, txt);
+  }
+  return null;
+}
+"""
+
+def _sidebar_month_label(driver):
+    js = SIDEBAR_WRAP_JS + SIDEBAR_LABEL_JS + "return __slcm_month_label();"
     try:
         raw = driver.execute_script(js)
     except Exception:
@@ -248,8 +406,7 @@ def _sidebar_month_label(driver):
     if not raw:
         return None
 
-    m = re.search(r"\b(January|February|March|April|May|June|July|August|September|October|November|December|"
-                  r"Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)\b(?:[^0-9]{0,3}(\d{4}))?", raw, re.I)
+    m = _MONTH_RE.search(raw)
     if m:
         mon = m.group(1)
         yr = m.group(2)
@@ -278,52 +435,270 @@ def _parse_month_label_to_date(lbl):
             return None, None
     return date.today().year, dt.month
 
-def _click_sidebar_prev_next_once(driver, which):
-    js = """
-    const which = arguments[0];
-    const wrap = document.querySelector('#calendarSidebar') || document.querySelector('.calendarSidebar') || document.getElementById('calendarSidebar');
-    if (!wrap) return false;
-    const candidates = [
-      "button[title='Previous Month']",
-      "button[title='Next Month']",
-      "button[aria-label='Previous Month']",
-      "button[aria-label='Next Month']",
-      ".slds-datepicker__nav .slds-button_icon",
-      ".uiDatePicker .ui-datepicker-prev",
-      ".uiDatePicker .ui-datepicker-next"
-    ];
-    for (const sel of candidates) {
-      try {
-        const el = wrap.querySelector(sel);
-        if (!el) continue;
-        if (sel === ".slds-datepicker__nav .slds-button_icon") {
-          const btns = wrap.querySelectorAll(".slds-datepicker__nav .slds-button_icon");
-          if (btns && btns.length >= 2) {
-            if (which === 'prev') { btns[0].click(); return true; }
-            else { btns[1].click(); return true; }
-          }
-        } else {
-          if (sel.includes('Previous') && which==='prev') { el.click(); return true; }
-          if (sel.includes('Next') && which==='next') { el.click(); return true; }
-          el.click(); return true;
+# Clicks the sidebar prev/next control; bumps __slcm_nav_seq so the month-label memo is dropped
+SIDEBAR_NAV_JS = """
+function __slcm_nav_click(which) {
+  const wrap = __slcm_wrap();
+  if (!wrap) return false;
+  window.__slcm_wrap = null;  // month nav may re-render the sidebar
+  const go = el => { el.click(); window.__slcm_nav_seq = (window.__slcm_nav_seq || 0) + 1; return true; };
+  const candidates = [
+    "button[title='Previous Month']",
+    "button[title='Next Month']",
+    "button[aria-label='Previous Month']",
+    "button[aria-label='Next Month']",
+    ".slds-datepicker__nav .slds-button_icon",
+    ".uiDatePicker .ui-datepicker-prev",
+    ".uiDatePicker .ui-datepicker-next"
+  ];
+  for (const sel of candidates) {
+    try {
+      const el = wrap.querySelector(sel);
+      if (!el) continue;
+      if (sel === ".slds-datepicker__nav .slds-button_icon") {
+        const btns = wrap.querySelectorAll(".slds-datepicker__nav .slds-button_icon");
+        if (btns && btns.length >= 2) {
+          if (which === 'prev') return go(btns[0]);
+          else return go(btns[1]);
         }
-      } catch(e) {}
-    }
-    const arrows = Array.from(wrap.querySelectorAll('button, a'))
-                 .filter(n => (n.innerText||n.textContent||'').includes('◀') || (n.innerText||n.textContent||'').includes('▶') || n.className.indexOf('prev')>=0 || n.className.indexOf('next')>=0);
-    if (arrows.length) {
-      if (which === 'prev') { arrows[0].click(); return true; }
-      else { arrows[arrows.length-1].click(); return true; }
-    }
-    return false;
-    """
+      } else {
+        if (sel.includes('Previous') && which==='prev') return go(el);
+        if (sel.includes('Next') && which==='next') return go(el);
+        return go(el);
+      }
+    } catch(e) {}
+  }
+  let first = null, last = null;
+  for (const n of wrap.querySelectorAll('button, a')) {
+    const t = n.textContent || '', c = String(n.className || '');
+    const isPrev = t.includes('◀') || c.includes('prev'), isNext = t.includes('▶') || c.includes('next');
+    if (!isPrev && !isNext) continue;
+    if (which === 'prev' && isPrev) return go(n);
+    if (which === 'next' && isNext) return go(n);
+    if (!first) first = n;
+    last = n;
+  }
+  if (first) return go(which === 'prev' ? first : last);
+  return false;
+}
+"""
+
+def _click_sidebar_prev_next_once(driver, which):
+    js = SIDEBAR_WRAP_JS + SIDEBAR_NAV_JS + "return __slcm_nav_click(arguments[0]);"
     try:
         return bool(driver.execute_script(js, which))
     except Exception:
         return False
 
+# Async: click prev/next and resolve on the sidebar's first DOM mutation (or after timeoutMs)
+SIDEBAR_NAV_SETTLE_JS = SIDEBAR_WRAP_JS + SIDEBAR_NAV_JS + """
+const which = arguments[0], timeoutMs = arguments[1];
+const done = arguments[arguments.length - 1];
+const wrap = __slcm_wrap();
+if (!wrap) { done(false); return; }
+let finished = false;
+const finish = v => { if (finished) return; finished = true; obs.disconnect(); done(v); };
+const obs = new MutationObserver(() => finish(true));
+obs.observe(wrap, {childList: true, subtree: true, characterData: true});
+if (!__slcm_nav_click(which)) { finish(false); return; }
+setTimeout(() => finish(true), timeoutMs);
+"""
+
+def _click_sidebar_prev_next_settled(driver, which, timeout_ms=300):
+    try:
+        return bool(driver.execute_async_script(SIDEBAR_NAV_SETTLE_JS, which, timeout_ms))
+    except Exception:
+        return False
+
+# Clicks the in-month sidebar cell whose text is the day number
+SIDEBAR_DAY_JS = """
+function __slcm_click_day(day) {
+  const wrap = __slcm_wrap();
+  if (!wrap) return false;
+  const DISABLED_RE = /disabled|prevmonth|nextmonth|outside|adjacent|other-month/;
+  const cells = wrap.querySelectorAll('td, .slds-day, button, a');
+  for (const cell of cells) {
+      const text = (cell.textContent || '').trim();
+      const classes = (cell.className || '').toLowerCase();
+      if (text === day && !DISABLED_RE.test(classes) && cell.getAttribute('aria-disabled') !== 'true') {
+          cell.scrollIntoView({block: 'center'});
+          try { cell.click(); } catch(e) { cell.dispatchEvent(new MouseEvent('click', {bubbles: true})); }
+          return true;
+      }
+  }
+  return false;
+}
+"""
+
+# Async-style helper: steps the sidebar month towards target (y*12+m), waiting up to 1s
+# for the header to re-render after each click, then calls cb({navigated, onTarget, label}).
+# Stops early once window.__slcm_abort is set (the caller timed out and gave up).
+SIDEBAR_GOTO_JS = """
+function __slcm_goto_month(target, maxNav, cb) {
+  const MONTHS = ['jan','feb','mar','apr','may','jun','jul','aug','sep','oct','nov','dec'];
+  const monthIndex = lbl => {
+    const now = new Date();
+    const m = (lbl || '').match(/\\b(January|February|March|April|May|June|July|August|September|October|November|December|Jan|Feb|Mar|Apr|Jun|Jul|Aug|Sept|Sep|Oct|Nov|Dec)\\b(?:[^0-9]{0,3}(\\d{4}))?/i);
+    const mi = m ? MONTHS.indexOf(m[1].slice(0, 3).toLowerCase()) : -1;
+    if (mi < 0) return now.getFullYear() * 12 + now.getMonth() + 1;
+    return (m[2] ? parseInt(m[2], 10) : now.getFullYear()) * 12 + mi + 1;
+  };
+  let label = __slcm_month_label(), cur = monthIndex(label), navigated = 0;
+  const step = () => {
+    if (window.__slcm_abort) return cb({navigated: navigated, onTarget: false, label: label});
+    if (cur === target || navigated >= maxNav) return cb({navigated: navigated, onTarget: cur === target, label: label});
+    const before = label;
+    if (!__slcm_nav_click(target > cur ? 'next' : 'prev')) return cb({navigated: navigated, onTarget: false, label: label});
+    navigated++;
+    const t0 = performance.now();
+    (function settle() {
+      label = __slcm_month_label();
+      if (label !== before || performance.now() - t0 > 1000) { cur = monthIndex(label); return step(); }
+      setTimeout(settle, 20);
+    })();
+  };
+  step();
+}
+"""
+
+# Async: navigate to the target month and click the day, all in one round-trip
+ROBUST_NAV_JS = SIDEBAR_WRAP_JS + SIDEBAR_LABEL_JS + SIDEBAR_NAV_JS + SIDEBAR_GOTO_JS + SIDEBAR_DAY_JS + """
+const done = arguments[arguments.length - 1];
+const day = String(arguments[2]);
+window.__slcm_abort = false;
+__slcm_goto_month(arguments[0] * 12 + arguments[1], arguments[3], r => done({
+  navigated: r.navigated, onTarget: r.onTarget, clicked: __slcm_click_day(day), finalLabel: r.label
+}));
+"""
+
+# Clicks a candidate tagged by collect_candidates() and records its date in
+# window.__slcm_last_clicked_date; returns the date string, or null if not found
+CLICK_CANDIDATE_JS = SIDEBAR_WRAP_JS + """
+function __slcm_click_candidate(cid, day, expectDate) {
+  const wrap = __slcm_wrap();
+  if (!wrap) return null;
+  const n = wrap.querySelector('[data-slcm-id="' + cid + '"]');
+  if (!n) return null;
+  // LWC reuses day cells on re-render: the tagged node must still show the day/date it was picked for
+  if ((n.textContent || '').trim() !== day || (n.getAttribute('data-date') || '').trim() !== expectDate) return null;
+  let dataDate = n.getAttribute('data-date') || '';
+  if (!dataDate) {
+    const aria = (n.getAttribute('aria-label')||n.getAttribute('title')||'').trim();
+    const m = aria.match(/([A-Za-z]+)\\s+(\\d{1,2}),?\\s*(\\d{4})/);
+    if (m) {
+      const mm = new Date(Date.parse(m[1] + ' 1, ' + m[3])).getMonth() + 1;
+      const dd = String(m[2]).padStart(2,'0');
+      const mo = String(mm).padStart(2,'0');
+      dataDate = `${m[3]}-${mo}-${dd}`;
+    }
+  }
+  try { window.__slcm_last_clicked_date = dataDate || ''; } catch(e){}
+  n.scrollIntoView({block:'center'});
+  try { n.click(); } catch(e) { n.dispatchEvent(new MouseEvent('click',{bubbles:true})); }
+  return dataDate || '';
+}
+"""
+
+# Async: click, then poll every 50ms (up to timeoutMs) for the clicked date's panel with an event list
+CLICK_VERIFY_JS = """
+const cid = arguments[0], target = arguments[1], timeoutMs = arguments[2], day = arguments[3], expectDate = arguments[4];
+const done = arguments[arguments.length - 1];
+let dataDate = null;
+try { dataDate = __slcm_click_candidate(cid, day, expectDate); } catch(e) {}
+if (dataDate === null) { done({clicked: false, verified: false, dataDate: null}); return; }
+const want = dataDate || target;
+const check = () => {
+  try {
+    const el = want ? document.querySelector("[data-date='" + want + "']") : null;
+    if (!el) return false;
+    const p = el.closest('div.calendarDay') || el.closest('section') || el.closest('div') || el;
+    return !!p.querySelector('div.eventList, div.calendarDay, ul.eventListContainer');
+  } catch(e) { return false; }
+};
+const t0 = performance.now();
+(function poll() {
+  if (check()) return done({clicked: true, verified: true, dataDate: dataDate});
+  if (performance.now() - t0 > timeoutMs) return done({clicked: true, verified: false, dataDate: dataDate});
+  setTimeout(poll, 50);
+})();
+"""
+
+# True once the panel for iso (or the day headed by one of `wanted`) has an event list
+PANEL_CHECK_JS = """
+function __slcm_panel_opened(iso, wanted) {
+  if (iso) {
+    const el = document.querySelector("[data-date='" + iso + "']");
+    if (el) {
+      const p = el.closest('div.calendarDay') || el.closest('section') || el.closest('div') || el;
+      if (p.querySelector('div.eventList, div.calendarDay, ul.eventListContainer')) return true;
+    }
+  }
+  for (const h of document.querySelectorAll('h2.slds-assistive-text')) {
+    const txt = (h.textContent || '').split(/\\s+/).filter(Boolean).join(' ').toLowerCase();
+    if (wanted.indexOf(txt) === -1) continue;
+    for (let sib = h.nextElementSibling; sib; sib = sib.nextElementSibling) {
+      if (sib.tagName === 'DIV' && (sib.getAttribute('class') || '').indexOf('calendarDay') !== -1 &&
+          sib.querySelector('div.eventList')) return true;
+    }
+  }
+  return false;
+}
+"""
+
+PANEL_OPENED_JS = PANEL_CHECK_JS + "return __slcm_panel_opened(window.__slcm_last_clicked_date || arguments[0], arguments[1]);"
+
+# Async: select a date in one round-trip -- sidebar data-date cell, then any data-date cell
+# on the page, then month navigation + day click -- stopping at the first one whose panel
+# opens. Resolves {ok, step}; on failure the caller falls back to the step-by-step path.
+SELECT_DATE_JS = (SIDEBAR_WRAP_JS + SIDEBAR_LABEL_JS + SIDEBAR_NAV_JS + SIDEBAR_GOTO_JS +
+                  SIDEBAR_DAY_JS + PANEL_CHECK_JS + """
+const iso = arguments[0], day = String(arguments[1]), wanted = arguments[2];
+const maxNav = arguments[3], timeoutMs = arguments[4];
+const done = arguments[arguments.length - 1];
+window.__slcm_abort = false;
+const ym = iso.split('-').map(Number);
+const click = el => {
+  el.scrollIntoView({block:'center'});
+  try { el.click(); } catch(e) { el.dispatchEvent(new MouseEvent('click',{bubbles:true})); }
+};
+const verify = (step, next) => {
+  window.__slcm_last_clicked_date = iso;
+  const t0 = performance.now();
+  (function poll() {
+    if (window.__slcm_abort) return;
+    if (__slcm_panel_opened(iso, wanted)) return done({ok: true, step: step});
+    if (performance.now() - t0 > timeoutMs) return next();
+    setTimeout(poll, 50);
+  })();
+};
+const fail = step => () => done({ok: false, step: step});
+const viaNav = () => __slcm_goto_month(ym[0] * 12 + ym[1], maxNav, r => {
+  if (!r.onTarget) return done({ok: false, step: 'nav', label: r.label});
+  const wrap = __slcm_wrap();
+  const exact = wrap ? wrap.querySelector("[data-date='" + iso + "']") : null;
+  if (exact) { click(exact); return verify('nav', fail('nav')); }
+  if (!__slcm_click_day(day)) return done({ok: false, step: 'nav', label: r.label});
+  verify('nav', fail('nav'));
+});
+const wrap = __slcm_wrap();
+const side = wrap ? wrap.querySelector("[data-date='" + iso + "']") : null;
+const viaGlobal = () => {
+  const el = document.querySelector("[data-date='" + iso + "']");
+  if (!el || el === side) return viaNav();
+  click(el);
+  verify('global', viaNav);
+};
+if (side) { click(side); verify('sidebar', viaGlobal); } else viaGlobal();
+""")
+
 # ---------- Enhanced click function with proper date filtering ----------
 def click_calendar_date_fast(driver, day_number, target_date=None):
+    # target-derived strings, computed once per call
+    target_iso = target_date.strftime("%Y-%m-%d") if target_date else None
+    target_month = target_date.strftime("%B") if target_date else ""
+    target_month_lower = target_month.lower()
+    target_year = str(target_date.year) if target_date else ""
+    target_headers = [h.lower() for h in day_header_strings(target_date)] if target_date else []
     def get_shown_month_index():
         lbl = _sidebar_month_label(driver)
         if lbl:
@@ -333,18 +708,24 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
         td = date.today()
         return td.year*12 + td.month
 
-    def collect_candidates():
-        js = """
+    def collect_candidates(limit=0):
+        js = SIDEBAR_WRAP_JS + """
         const day = arguments[0];
         const targetDate = arguments[1]; // YYYY-MM-DD format
-        const wrap = document.querySelector('#calendarSidebar') || document.querySelector('.calendarSidebar') || document.getElementById('calendarSidebar');
+        const limit = arguments[2];
+        const monthLower = arguments[3], year = arguments[4], verbose = arguments[5];
+        const wrap = __slcm_wrap();
         if (!wrap) return [];
         const wrapRect = wrap.getBoundingClientRect();
-        const nodes = Array.from(wrap.querySelectorAll('*'));
+        for (const old of wrap.querySelectorAll('[data-slcm-id]')) old.removeAttribute('data-slcm-id');
+        const DISABLED_RE = /disabled|prevmonth|nextmonth|outside|adjacent|other-month/;
+        // day cells only; the full descendant walk is kept for sidebars that use other markup
+        let nodes = wrap.querySelectorAll('td.slds-day, .slds-day, td[data-date], [role="gridcell"], button[data-date]');
+        if (!nodes.length) nodes = wrap.querySelectorAll('*');
         const out = [];
         for (const n of nodes) {
           try {
-            const txt = (n.innerText || n.textContent || '').trim();
+            const txt = (n.textContent || '').trim();
             if (txt !== day) continue;
             
             const dataDate = (n.getAttribute('data-date') || '').trim();
@@ -362,15 +743,7 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
             }
             
             // Check if this is a disabled/grayed out date
-            const isDisabled = cls.includes('disabled') || 
-                              cls.includes('slds-disabled') ||
-                              cls.includes('slds-disabled-text') ||
-                              cls.includes('prevmonth') || 
-                              cls.includes('nextmonth') ||
-                              cls.includes('outside') ||
-                              cls.includes('adjacent') ||
-                              cls.includes('other-month') ||
-                              n.getAttribute('aria-disabled') === 'true';
+            const isDisabled = DISABLED_RE.test(cls) || n.getAttribute('aria-disabled') === 'true';
             
             // Exact data-date match gets highest priority
             let priority = 0;
@@ -384,97 +757,98 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
               priority = 10; // Low priority for disabled dates
             }
             
-            out.push({
-              top: relTop,
-              html: n.outerHTML || '',
-              cls: cls,
-              aria: aria,
-              title: title,
+            // Unambiguous = exact data-date, or aria/title naming the target month or year
+            const label = (aria + ' ' + title).trim();
+            const unambiguous = !!(targetDate && dataDate === targetDate) ||
+              !!(label && ((monthLower && label.toLowerCase().includes(monthLower)) || (year && label.includes(year))));
+
+            // Tag the node so __slcm_click_candidate() can find it again without re-walking the sidebar
+            n.setAttribute('data-slcm-id', String(out.length));
+            // rank packs priority over row: higher is better, top row wins within a priority
+            const c = {
+              id: out.length,
+              rank: priority * 1048576 + (1048575 - Math.min(Math.floor(relTop), 1048575)),
               dataDate: dataDate,
               isDisabled: isDisabled,
-              priority: priority
-            });
+              unambiguous: unambiguous
+            };
+            if (verbose) { c.priority = priority; c.top = relTop; c.cls = cls; c.aria = aria; }
+            out.push(c);
           } catch(e) {}
         }
-        return out;
+        // rank here (exact/same-month first, then enabled, then disabled; top row first)
+        out.sort((a, b) => b.rank - a.rank);
+        return limit ? out.slice(0, limit) : out;
         """
         try:
-            target_date_str = target_date.strftime("%Y-%m-%d") if target_date else None
-            return driver.execute_script(js, str(day_number), target_date_str)
+            return driver.execute_script(js, str(day_number), target_iso, limit, target_month_lower, target_year, DEBUG)
         except Exception:
             return []
 
-    def click_fragment(html_frag):
-        js_click = """
-        const frag = arguments[0];
-        const wrap = document.querySelector('#calendarSidebar') || document.querySelector('.calendarSidebar') || document.getElementById('calendarSidebar');
-        if (!wrap) return false;
-        const nodes = Array.from(wrap.querySelectorAll('*'));
-        for (const n of nodes) {
-          try {
-            if ((n.outerHTML || '').indexOf(frag) !== -1) {
-              let dataDate = n.getAttribute('data-date') || '';
-              if (!dataDate) {
-                const aria = (n.getAttribute('aria-label')||n.getAttribute('title')||'').trim();
-                const m = aria.match(/([A-Za-z]+)\\s+(\\d{1,2}),?\\s*(\\d{4})/);
-                if (m) {
-                  const mm = new Date(Date.parse(m[1] + ' 1, ' + m[3])).getMonth() + 1;
-                  const dd = String(m[2]).padStart(2,'0');
-                  const mo = String(mm).padStart(2,'0');
-                  dataDate = `${m[3]}-${mo}-${dd}`;
-                }
-              }
-              try { window.__slcm_last_clicked_date = dataDate || ''; } catch(e){}
-              n.scrollIntoView({block:'center'});
-              try { n.click(); } catch(e) { n.dispatchEvent(new MouseEvent('click',{bubbles:true})); }
-              return true;
-            }
-          } catch(e){}
-        }
-        return false;
-        """
+    last_click = {}  # data-date of the most recent candidate click, for wrong-month detection
+
+    def click_and_verify(cand, timeout_ms=1500):
+        # click + panel check in one async call; the browser keeps rendering while it polls.
+        # The page re-checks the tagged node's day text and data-date before clicking.
         try:
-            return bool(driver.execute_script(js_click, html_frag))
+            res = driver.execute_async_script(CLICK_CANDIDATE_JS + CLICK_VERIFY_JS, cand.get('id'), target_iso,
+                                              timeout_ms, str(day_number), cand.get('dataDate') or "")
         except Exception:
+            res = None
+        last_click['dataDate'] = (res or {}).get('dataDate') or ""
+        if not res or not res.get('clicked'):
             return False
+        if res.get('verified'):
+            if DEBUG: print("click_and_verify: panel for", res.get('dataDate'), "verified in-page")
+            return True
+        return panel_opened_ok(settle=False)
 
     def click_main_grid(target_date):
-        js = """
-        const day = arguments[0], month = arguments[1], year = arguments[2];
+        js = SIDEBAR_WRAP_JS + """
+        const day = arguments[0], month = arguments[1], year = arguments[2], iso = arguments[3];
+        const wrap = __slcm_wrap();
+        const clickIt = n => {
+          n.scrollIntoView({block:'center'});
+          try { n.click(); } catch(e) { n.dispatchEvent(new MouseEvent('click',{bubbles:true})); }
+          return true;
+        };
+        // the sidebar's own cell was already tried by the pre-check; look outside it
+        const exact = iso ? Array.from(document.querySelectorAll("[data-date='" + iso + "']"))
+                              .find(n => !(wrap && wrap.contains(n))) : null;
+        if (exact) return clickIt(exact);
         const patt1 = month + " " + day + ", " + year;
         const patt2 = month + " " + day + " " + year;
-        const nodes = Array.from(document.querySelectorAll('*'));
-        for (const n of nodes) {
+        for (const n of document.querySelectorAll('[aria-label], [title], [data-date]')) {
           try {
-            const a = (n.getAttribute('aria-label')||'') + '||' + (n.getAttribute('title')||'') + '||' + (n.getAttribute('data-date')||'') + '||' + (n.innerText||n.textContent||'');
-            if (a.indexOf(patt1) !== -1 || a.indexOf(patt2) !== -1 || a.indexOf(month + ' ' + day) !== -1) {
-              n.scrollIntoView({block:'center'});
-              try { n.click(); } catch(e) { n.dispatchEvent(new MouseEvent('click',{bubbles:true})); }
-              return true;
-            }
+            const a = (n.getAttribute('aria-label')||'') + '||' + (n.getAttribute('title')||'') + '||' + (n.getAttribute('data-date')||'') + '||' + (n.textContent||'').replace(/\\s+/g, ' ');
+            if (a.indexOf(patt1) !== -1 || a.indexOf(patt2) !== -1 || a.indexOf(month + ' ' + day) !== -1) return clickIt(n);
           } catch(e){}
         }
-        for (const n of nodes) {
+        for (const n of document.querySelectorAll('td, .slds-day')) {
           try { 
-            const txt = (n.innerText||n.textContent||'').trim();
+            const txt = (n.textContent||'').trim();
             const cls = (n.className || '').toLowerCase();
-            const isDisabled = cls.includes('disabled') || cls.includes('slds-disabled') || cls.includes('prevmonth') || cls.includes('nextmonth');
-            if (txt === String(day) && !isDisabled) { 
-              n.scrollIntoView({block:'center'}); 
-              try{ n.click(); } catch(e){ n.dispatchEvent(new MouseEvent('click',{bubbles:true})); } 
-              return true; 
-            } 
+            const isDisabled = /disabled|prevmonth|nextmonth/.test(cls);
+            if (txt === String(day) && !isDisabled) return clickIt(n);
           } catch(e){}
         }
         return false;
         """
         try:
-            return bool(driver.execute_script(js, target_date.day, target_date.strftime("%B"), target_date.year))
+            return bool(driver.execute_script(js, target_date.day, target_month, target_date.year, target_iso))
         except Exception:
             return False
 
-    def panel_opened_ok():
-        time.sleep(0.5)
+    def panel_opened_ok(settle=True):
+        if settle:
+            # poll for the clicked day's panel instead of a fixed settle sleep
+            try:
+                WebDriverWait(driver, 1.5, poll_frequency=0.05).until(
+                    lambda d: d.execute_script(PANEL_OPENED_JS, target_iso, target_headers))
+                if DEBUG: print("panel_opened_ok: panel appeared while polling -> OK")
+                return True
+            except Exception:
+                pass
 
         def _has_event_list(elem):
             try:
@@ -578,7 +952,7 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
                 if DEBUG: print("panel_opened_ok: exception during data-date panel search (falling back)", sys.exc_info()[0])
 
         try:
-            panel = find_day_panel_for_date(driver, target_date)
+            panel = find_day_panel_for_date(driver, frozenset(target_headers))
             if panel:
                 if DEBUG: print("panel_opened_ok: found panel using header-based detection")
                 try:
@@ -592,7 +966,7 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
             if DEBUG: print("panel_opened_ok: header-based detection raised exception", sys.exc_info()[0])
 
         try:
-            expected = [h.lower() for h in day_header_strings(target_date)]
+            expected = target_headers
             headers = driver.find_elements(By.CSS_SELECTOR, "h2, h3, h1")
             for h in headers:
                 try:
@@ -617,22 +991,15 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
 
     # If no target_date, attempt a simple direct click with disabled filtering
     if target_date is None:
-        js_direct = """
-        const wrap = document.querySelector('#calendarSidebar') || document.querySelector('.calendarSidebar') || document.getElementById('calendarSidebar');
+        js_direct = SIDEBAR_WRAP_JS + """
+        const wrap = __slcm_wrap();
         if (!wrap) return false;
+        const DISABLED_RE = /disabled|prevmonth|nextmonth|outside|adjacent/;
         const nodes = wrap.querySelectorAll('table.datepicker .slds-day, .slds-day, table.datepicker td, table td, td');
         for (const n of nodes) {
             const txt = (n.textContent || '').trim();
             const cls = (n.className || '').toLowerCase();
-            const disabled = n.getAttribute && (
-                n.getAttribute('aria-disabled') === 'true' ||
-                cls.includes('disabled') || 
-                cls.includes('slds-disabled') ||
-                cls.includes('prevmonth') || 
-                cls.includes('nextmonth') ||
-                cls.includes('outside') ||
-                cls.includes('adjacent')
-            );
+            const disabled = n.getAttribute && (n.getAttribute('aria-disabled') === 'true' || DISABLED_RE.test(cls));
             if (!disabled && txt === arguments[0]) { 
                 n.scrollIntoView({block:'center'}); 
                 try{ n.click(); } catch(e){} 
@@ -649,41 +1016,55 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
             raise RuntimeError(f"❌ Could not click mini calendar date {day_number}")
         return
 
+    # One round-trip for the common case; everything below is the step-by-step fallback.
+    # Worst case is ~1s per month step plus three 1.5s panel checks.
+    try:
+        prev_script_timeout = driver.timeouts.script
+    except Exception:
+        prev_script_timeout = 30
+    try:
+        driver.set_script_timeout(24 + 3 * 1.5 + 5)
+        res = driver.execute_async_script(SELECT_DATE_JS, target_iso, target_date.day, target_headers, 24, 1500)
+    except Exception as e:
+        if DEBUG: print("select-date script failed:", repr(e))
+        res = None
+        # stop the in-page navigation so it can't race the fallback below
+        try:
+            driver.execute_script("window.__slcm_abort = true;")
+        except Exception:
+            pass
+    finally:
+        try:
+            driver.set_script_timeout(prev_script_timeout)
+        except Exception:
+            pass
+    if res and res.get('ok'):
+        if DEBUG: print("✅ Date selected in-page via", res.get('step'))
+        return
+    if DEBUG: print("select-date script fell through:", res)
+
         # ---------- SAFE QUICK PRE-CHECK (avoid ambiguous sidebar clicks; jump to robust) ----------
     try:
         pre_cands = collect_candidates()
     except Exception:
         pre_cands = []
 
-    # Helper: candidate unambiguous if it has exact dataDate OR month/year in aria/title
-    def unambiguous_for_target(c):
-        dd = (c.get('dataDate') or "").strip()
-        if dd and target_date and dd == target_date.strftime("%Y-%m-%d"):
-            return True
-        txt = ((c.get('aria') or "") + " " + (c.get('title') or "")).strip()
-        if txt:
-            mon = target_date.strftime("%B") if target_date else ""
-            yr = str(target_date.year) if target_date else ""
-            if mon and mon.lower() in txt.lower():
-                return True
-            if yr and yr in txt:
-                return True
-        return False
+    # Candidates carry an in-page 'unambiguous' flag: exact dataDate OR month/year in aria/title
 
     # 1) Exact data-date in sidebar candidates (highest confidence)
     if pre_cands:
-        exact_now = [c for c in pre_cands if c.get('dataDate') and target_date and c.get('dataDate') == target_date.strftime("%Y-%m-%d")]
+        exact_now = [c for c in pre_cands if c.get('dataDate') and target_iso and c.get('dataDate') == target_iso]
         if exact_now:
-            pick = sorted(exact_now, key=lambda c: (c.get('top', 0)))[0]
+            pick = exact_now[0]
             if DEBUG: print("quick-precheck: clicking exact data-date candidate (no nav needed)")
-            if click_fragment(pick.get('html')) and panel_opened_ok():
+            if click_and_verify(pick):
                 if DEBUG: print("✅ Quick precheck exact click succeeded")
                 return
 
     # 2) Try global data-date anywhere on page (very reliable)
     try:
         if target_date:
-            target_dd = target_date.strftime("%Y-%m-%d")
+            target_dd = target_iso
             if DEBUG: print("quick-precheck: looking for global data-date element", target_dd)
             clicked_global = driver.execute_script("""
                 const t = arguments[0];
@@ -707,8 +1088,9 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
     if pre_cands:
         non_disabled_now = [c for c in pre_cands if not c.get('isDisabled', False)]
         if non_disabled_now:
-            unamb = [c for c in non_disabled_now if unambiguous_for_target(c)]
-            ambiguous = [c for c in non_disabled_now if not unambiguous_for_target(c)]
+            unamb, ambiguous = [], []
+            for c in non_disabled_now:
+                (unamb if c.get('unambiguous') else ambiguous).append(c)
             if DEBUG and ambiguous:
                 sample = []
                 for c in ambiguous[:6]:
@@ -722,9 +1104,9 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
 
             # If we have unambiguous candidates, try them (safe).
             if unamb:
-                pick = sorted(unamb, key=lambda c: (c.get('top', 0)))[0]
+                pick = unamb[0]
                 if DEBUG: print("quick-precheck: clicking unambiguous same-month candidate, cls=", pick.get('cls'))
-                if click_fragment(pick.get('html')) and panel_opened_ok():
+                if click_and_verify(pick):
                     if DEBUG: print("✅ Quick precheck unambiguous click succeeded")
                     return
             else:
@@ -754,44 +1136,35 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
         shown_month_index = get_shown_month_index()
 
     # collect candidates with enhanced filtering
-    candidates = collect_candidates()
-    if not candidates:
+    # already ranked in-page; only the best few are worth a click
+    click_order = collect_candidates(limit=6)
+    if not click_order:
         raise RuntimeError(f"❌ No mini-calendar candidates found for day {day_number}")
 
-    candidates_sorted = sorted(candidates, key=lambda c: (-c.get('priority', 0), c.get('top', 0)))
-
-    click_order = []
-    exact_matches = [c for c in candidates_sorted if c.get('priority', 0) >= 90]
-    if exact_matches:
-        click_order.extend(exact_matches)
-    non_disabled = [c for c in candidates_sorted if not c.get('isDisabled', False) and c not in click_order]
-    if non_disabled:
-        click_order.extend(non_disabled)
-    remaining = [c for c in candidates_sorted if c not in click_order]
-    click_order.extend(remaining)
-
-    MAX_TRIES = max(6, len(click_order)*2)
-    tried = 0
-
+    wrong_month_streak = 0
     for idx, candidate in enumerate(click_order):
-        if tried >= MAX_TRIES:
-            break
-        tried += 1
         if DEBUG:
             lbl = _sidebar_month_label(driver)
             print(f"[click attempt] trying day {day_number} (label={lbl}) candidate #{idx+1} priority={candidate.get('priority')} disabled={candidate.get('isDisabled')} cls={candidate.get('cls')}")
-        clicked = click_fragment(candidate.get('html'))
-        if not clicked:
-            if DEBUG: print("candidate click failed, continuing")
-            time.sleep(0.10)
-            continue
-        if panel_opened_ok():
+        if click_and_verify(candidate):
             if DEBUG: print(f"✅ Clicked calendar date: {day_number} (candidate #{idx+1})")
             return
+        if DEBUG: print("⚠️ Candidate click failed or opened the wrong panel — will try next candidate")
+        dd = last_click.get('dataDate')
+        if dd and target_iso and dd[:7] != target_iso[:7]:
+            wrong_month_streak += 1
+            if wrong_month_streak >= 2:
+                # sidebar keeps handing us other-month cells; the navigator is the better bet
+                if DEBUG: print("Two wrong-month opens in a row — switching to robust navigator")
+                try:
+                    click_calendar_date_robust(driver, target_date)
+                    return
+                except Exception as e:
+                    if DEBUG: print("robust navigator raised:", repr(e))
+                    break
         else:
-            if DEBUG: print("⚠️ Clicked but wrong panel — will try next candidate")
-            time.sleep(0.10)
-            continue
+            wrong_month_streak = 0
+        time.sleep(0.10)
 
     # fallback to main-grid with enhanced filtering
     if DEBUG: print("Attempting fallback click on main calendar grid for", target_date)
@@ -801,16 +1174,15 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
             return
         if DEBUG: print("Fallback main-grid click did not open correct panel")
 
-    # final nudge and reattempt
-    if DEBUG: print("Final attempt: nudging month then re-collecting candidates")
-    _click_sidebar_prev_next_once(driver, 'next'); time.sleep(0.10)
-    _click_sidebar_prev_next_once(driver, 'prev'); time.sleep(0.10)
-    candidates = collect_candidates()
-    candidates_sorted = sorted(candidates, key=lambda c: (-c.get('priority', 0), c.get('top', 0)))
-    for c in candidates_sorted:
-        if not c.get('isDisabled', False) and click_fragment(c.get('html')) and panel_opened_ok():
-            if DEBUG: print("✅ Clicked after nudge")
-            return
+    # final nudge and reattempt (opt-in)
+    if ENABLE_NUDGE:
+        if DEBUG: print("Final attempt: nudging month then re-collecting candidates")
+        _click_sidebar_prev_next_settled(driver, 'next')
+        _click_sidebar_prev_next_settled(driver, 'prev')
+        for c in collect_candidates(limit=6):
+            if not c.get('isDisabled', False) and click_and_verify(c):
+                if DEBUG: print("✅ Clicked after nudge")
+                return
 
     raise RuntimeError(f"❌ Could not click mini calendar date {day_number} (last known label={repr(_sidebar_month_label(driver))}) after retries")
 
@@ -818,61 +1190,18 @@ def click_calendar_date_fast(driver, day_number, target_date=None):
 # Alternative robust approach for problematic calendars
 # =========================================================
 def click_calendar_date_robust(driver, target_date):
-    def get_shown_month_index():
-        lbl = _sidebar_month_label(driver)
-        if lbl:
-            y,m = _parse_month_label_to_date(lbl)
-            if y and m:
-                return y*12 + m
-        td = date.today()
-        return td.year*12 + td.month
-
-    current_month_index = get_shown_month_index()
-    target_month_index = target_date.year * 12 + target_date.month
+    try:
+        res = driver.execute_async_script(ROBUST_NAV_JS, target_date.year, target_date.month, target_date.day, 24)
+    except Exception as e:
+        if DEBUG: print("robust navigator script failed:", repr(e))
+        res = None
 
-    max_nav_attempts = 24
-    nav_count = 0
-    while current_month_index != target_month_index and nav_count < max_nav_attempts:
-        direction = 'next' if target_month_index > current_month_index else 'prev'
-        if DEBUG: print(f"Navigating {direction} from month index {current_month_index} to {target_month_index}")
-        if not _click_sidebar_prev_next_once(driver, direction):
-            if DEBUG: print(f"Navigation control not found for {direction}")
-            break
-        time.sleep(0.12)
-        nav_count += 1
-        current_month_index = get_shown_month_index()
-
-    if current_month_index != target_month_index and DEBUG:
-        print(f"Warning: Could not navigate to target month. Current: {current_month_index}, Target: {target_month_index}")
-
-    js_click_current_month_date = """
-    const day = arguments[0];
-    const wrap = document.querySelector('#calendarSidebar') || document.querySelector('.calendarSidebar');
-    if (!wrap) return false;
-    const cells = wrap.querySelectorAll('td, .slds-day, button, a');
-    for (const cell of cells) {
-        const text = (cell.innerText || cell.textContent || '').trim();
-        const classes = (cell.className || '').toLowerCase();
-        if (text === day && 
-            !classes.includes('disabled') && 
-            !classes.includes('slds-disabled') &&
-            !classes.includes('slds-disabled-text') &&
-            !classes.includes('prevmonth') &&
-            !classes.includes('nextmonth') &&
-            !classes.includes('outside') &&
-            !classes.includes('adjacent') &&
-            !classes.includes('other-month') &&
-            cell.getAttribute('aria-disabled') !== 'true') {
-            cell.scrollIntoView({block: 'center'});
-            try { cell.click(); } catch(e) { cell.dispatchEvent(new MouseEvent('click', {bubbles: true})); }
-            return true;
-        }
-    }
-    return false;
-    """
+    if res and DEBUG:
+        print(f"Robust navigator: {res.get('navigated')} step(s), label={res.get('finalLabel')!r}, on target={res.get('onTarget')}")
+    if res and not res.get('onTarget') and DEBUG:
+        print(f"Warning: Could not navigate to target month {target_date:%B %Y}")
 
-    day_str = str(target_date.day)
-    if driver.execute_script(js_click_current_month_date, day_str):
+    if res and res.get('clicked'):
         if DEBUG: print(f"✅ Successfully clicked date {target_date} using robust method")
         return True
 
@@ -881,151 +1210,297 @@ def click_calendar_date_robust(driver, target_date):
 # =========================================================
 # Remaining helpers (events scanning, attendance manipulation)
 # =========================================================
+# header texts repeat on every readiness poll
+@lru_cache(maxsize=256)
 def _norm(s):
     return " ".join((s or "").split())
 
-def _has_word(haystack, needle):
-    return re.search(rf'\b{re.escape(needle)}\b', haystack) is not None
-
-def matches_event_text(txt, code, sem, sec, sess):
-    def norm(s): return " ".join((s or "").split()).upper()
-    T = norm(txt)
-
-    ok = True
-    if code:
-        ok = ok and (code.upper() in T)
-    if sem:
-        ok = ok and (f"SEMESTER {sem.upper()}" in T)
+# Upper-cased needles + compiled section patterns for one (code, sem, sec, sess);
+# built once per run so the per-link check only normalizes the haystack
+MatcherSpec = namedtuple("MatcherSpec", "code_up code_bare sem_up sec_up sec_pats sess_up")
 
+@lru_cache(maxsize=64)
+def build_matcher_spec(code, sem, sec, sess):
+    code_up = code.upper() if code else ""
+    sem_up = f"SEMESTER {sem.upper()}" if sem else ""
+    sec_up, sec_pats = "", ()
     if sec:
-        secU = sec.strip().upper()
-        if "-" in secU:
-            pat = rf'(?<![A-Z0-9]){re.escape(secU)}(?![A-Z0-9])'
-            ok = ok and re.search(pat, T) is not None
+        sec_up = sec.strip().upper()
+        if "-" in sec_up:
+            sec_pats = (re.compile(rf'(?<![A-Z0-9]){re.escape(sec_up)}(?![A-Z0-9])'),)
         else:
-            pat1 = rf'\bSEC(?:TION)?\s*[:\-]?\s*{re.escape(secU)}(?!\s*-\s*\d+)\b'
-            pat2 = rf'\(\s*{re.escape(secU)}\s*\)'
-            pat3 = rf'(?<![A-Z0-9]){re.escape(secU)}(?!\s*-\s*\d+)(?![A-Z0-9])'
-            ok = ok and (
-                re.search(pat1, T) is not None or
-                re.search(pat2, T) is not None or
-                re.search(pat3, T) is not None
-            )
+            # "SEC X" / "(X)" / bare X as one alternation: a single pass over the title
+            sec_pats = (re.compile(
+                rf'\bSEC(?:TION)?\s*[:\-]?\s*{re.escape(sec_up)}(?!\s*-\s*\d+)\b'
+                rf'|\(\s*{re.escape(sec_up)}\s*\)'
+                rf'|(?<![A-Z0-9]){re.escape(sec_up)}(?!\s*-\s*\d+)(?![A-Z0-9])'),)
+    sess_up = ""
+    if sess and sess.strip() and (not sec or "-" not in sec.strip()):
+        sess_up = f"SESSION {sess.strip().upper()}"
+    # a code without whitespace can be tested against the raw title before normalizing it
+    code_bare = bool(code_up) and len(code_up.split()) == 1 and code_up == code_up.strip()
+    return MatcherSpec(code_up, code_bare, sem_up, sec_up, sec_pats, sess_up)
+
+# titles at the top of the list are re-checked after every scroll step
+@lru_cache(maxsize=4096)
+def event_text_matches(txt, spec):
+    U = (txt or "").upper()
+    if spec.code_bare and spec.code_up not in U:
+        return False
+    T = " ".join(U.split())
+    if spec.code_up and spec.code_up not in T:
+        return False
+    if spec.sem_up and spec.sem_up not in T:
+        return False
+    # every section shape contains the section literally, so a substring miss skips the regex
+    if spec.sec_pats and (spec.sec_up not in T or not any(p.search(T) for p in spec.sec_pats)):
+        return False
+    if spec.sess_up and spec.sess_up not in T:
+        return False
+    return True
 
-    if ok and sess and sess.strip() and (not sec or "-" not in sec.strip()):
-        s = sess.strip().upper()
-        ok = ok and (f"SESSION {s}" in T)
+# SLCM's day headers read "Friday, August 8" (English names, unpadded day)
+@lru_cache(maxsize=64)
+def day_header_strings(d):
+    return (f"{_WEEKDAY_NAMES[d.weekday()]}, {_MONTH_NAMES[d.month - 1]} {d.day}",)
 
-    return ok
+@lru_cache(maxsize=8)
+def day_header_set(d):
+    return frozenset(h.lower() for h in day_header_strings(d))
 
-def day_header_strings(d):
-    parts = []
+# wanted: lower-cased day headers from day_header_set(), built once per date
+# need_list: only return the panel once its event list has rendered
+def find_day_panel_for_date(driver, wanted, need_list=False):
+    # One round-trip: match header text and resolve its calendarDay sibling in the page
     try:
-        if sys.platform != "win32":
-            parts.append(d.strftime("%A, %B %-d"))
-        else:
-            parts.append(d.strftime("%A, %B %#d"))
+        return driver.execute_script("""
+            const wanted = arguments[0], needList = arguments[1];
+            for (const h of document.querySelectorAll('h2.slds-assistive-text')) {
+              const txt = (h.textContent || '').split(/\\s+/).filter(Boolean).join(' ').toLowerCase();
+              if (wanted.indexOf(txt) === -1) continue;
+              for (let sib = h.nextElementSibling; sib; sib = sib.nextElementSibling) {
+                if (sib.tagName === 'DIV' && (sib.getAttribute('class') || '').indexOf('calendarDay') !== -1) {
+                  if (needList && !sib.querySelector('div.eventList ul.eventListContainer')) return null;
+                  return sib;
+                }
+              }
+            }
+            return null;
+        """, list(wanted), need_list)
     except Exception:
-        parts.append(d.strftime("%A, %B %d").lstrip("0").replace(", 0", ", "))
-    parts.append(d.strftime("%A, %B %d").lstrip("0").replace(", 0", ", "))
-    seen, out = set(), []
-    for s in parts:
-        s = _norm(s)
-        if s not in seen:
-            seen.add(s); out.append(s)
-    return out
-
-def find_day_panel_for_date(driver, selected_date):
+        pass
     headers = driver.find_elements(By.CSS_SELECTOR, "h2.slds-assistive-text")
-    wanted = [h.lower() for h in day_header_strings(selected_date)]
     for h in headers:
         try:
             txt = _norm(h.text).lower()
             if txt in wanted:
                 panel = h.find_element(By.XPATH, "following-sibling::div[contains(@class,'calendarDay')][1]")
+                if need_list and not panel.find_elements(By.CSS_SELECTOR, "div.eventList ul.eventListContainer"):
+                    return None
                 return panel
         except Exception:
             continue
     return None
 
-def wait_for_day_panel_ready(driver, selected_date, timeout=PANEL_READY_TIMEOUT):
-    t0 = time.time()
-    while time.time() - t0 < timeout:
-        panel = find_day_panel_for_date(driver, selected_date)
-        if panel is not None:
-            try:
-                panel.find_element(By.CSS_SELECTOR, "div.eventList ul.eventListContainer")
-                return panel
-            except Exception:
-                pass
-        time.sleep(0.25)
-    return None
-
-def wait_for_events_to_settle(driver, panel, timeout=EVENT_SETTLE_TIMEOUT):
-    t0 = time.time()
-    stable_since = None
-    last = (-1, -1)
-    while time.time() - t0 < timeout:
-        try:
-            metrics = driver.execute_script("""
-                const panel = arguments[0];
-                const list = panel.querySelector("div.eventList");
-                const cont = list ? list.querySelector("ul.eventListContainer") : null;
-                const h = list ? list.scrollHeight : 0;
-                const c = cont ? cont.children.length : 0;
-                return [h, c];
-            """, panel)
-        except Exception:
-            metrics = (0, 0)
-        if metrics == last:
-            if stable_since is None:
-                stable_since = time.time()
-            elif time.time() - stable_since >= 0.8:
-                return True
-        else:
-            last = metrics
-            stable_since = None
-        time.sleep(0.25)
-    return False
+def wait_for_day_panel_ready(driver, wanted, timeout=PANEL_READY_TIMEOUT):
+    def ready(d):
+        return find_day_panel_for_date(d, wanted, need_list=True) or False
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=0.05, ignored_exceptions=(Exception,)).until(ready)
+    except Exception:
+        return None
 
-def aria_date_matches_selected(aria_desc, selected_date):
-    if not aria_desc:
-        return False
-    txt = aria_desc.replace("–", "-")
-    m = re.search(r"([A-Za-z]+)\s+(\d{1,2})\s+([A-Za-z]+),\s*(\d{4})", txt)
-    if not m:
+def wait_after_date_click(driver, timeout=AFTER_DATE_CLICK_PAUSE):
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.05).until(
+            lambda d: d.execute_script("return !!document.querySelector('div.calendarDay div.eventList ul.eventListContainer');")
+        )
+        return True
+    except Exception:
         return False
+
+# Marks panel.__slcmSettled once its event list has gone 800ms without DOM changes;
+# the observer lives on the panel node, so a new panel starts unsettled
+SETTLE_OBSERVER_JS = """
+const panel = arguments[0];
+if (panel.__slcmObs) return;
+const target = panel.querySelector("div.eventList") || panel;
+panel.__slcmSettled = false;
+let t = setTimeout(() => { panel.__slcmSettled = true; }, 800);
+panel.__slcmObs = new MutationObserver(() => {
+  panel.__slcmSettled = false;
+  clearTimeout(t);
+  t = setTimeout(() => { panel.__slcmSettled = true; }, 800);
+});
+panel.__slcmObs.observe(target, {childList: true, subtree: true});
+"""
+
+def wait_for_events_to_settle(driver, panel, timeout=EVENT_SETTLE_TIMEOUT):
     try:
-        day, mon, yr = int(m.group(2)), m.group(3), int(m.group(4))
-        parsed = datetime.strptime(f"{day} {mon} {yr}", "%d %B %Y").date()
-        return parsed == selected_date
+        driver.execute_script(SETTLE_OBSERVER_JS, panel)
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            lambda d: d.execute_script("return arguments[0].__slcmSettled === true;", panel)
+        )
+        return True
     except Exception:
         return False
 
-def scroll_day_panel_gradual(driver, panel, max_seconds, code, sem, sec, sess, selected_date):
-    start = time.time()
+# In-page port of event_text_matches plus the aria-date check. __slcm_event_finder(spec)
+# compiles the section patterns (from build_matcher_spec) once and returns find(panel),
+# which yields the first matching event link, or null.
+EVENT_FIND_JS = """
+function __slcm_event_finder(spec) {
+  const MONTHS = ['january','february','march','april','may','june','july','august','september','october','november','december'];
+  const secRes = spec.sec.map(src => new RegExp(src));
+  const dateOk = aria => {
+    const m = (aria || '').replace(/\u2013/g, '-').match(/([A-Za-z]+)\\s+(\\d{1,2})\\s+([A-Za-z]+),\\s*(\\d{4})/);
+    if (!m) return false;
+    const mi = MONTHS.indexOf(m[3].toLowerCase());
+    return mi >= 0 && parseInt(m[4], 10) === spec.y && mi + 1 === spec.m && parseInt(m[2], 10) === spec.d;
+  };
+  return p => {
+    for (const a of p.querySelectorAll("a.subject-link, a[data-id='subject-link'], a")) {
+      const raw = (a.innerText || a.textContent || '').trim();
+      if (!raw) continue;
+      const T = raw.split(/\\s+/).filter(Boolean).join(' ').toUpperCase();
+      if (spec.code && T.indexOf(spec.code) === -1) continue;
+      if (spec.sem && T.indexOf(spec.sem) === -1) continue;
+      if (secRes.length && (T.indexOf(spec.secUp) === -1 || !secRes.some(re => re.test(T)))) continue;
+      if (spec.sess && T.indexOf(spec.sess) === -1) continue;
+      if (dateOk(a.getAttribute('aria-description'))) return a;
+    }
+    return null;
+  };
+}
+"""
+
+EVENT_MATCH_JS = EVENT_FIND_JS + "return __slcm_event_finder(arguments[1])(arguments[0]);"
+
+# __slcm_after_scroll(node, maxMs, cb): run cb on the next task once node's subtree has been
+# quiet for 50ms after a mutation (lazy rows rendered), or after maxMs if nothing changes
+AFTER_SCROLL_JS = """
+function __slcm_after_scroll(node, maxMs, cb) {
+  let quiet = null, fired = false, obs = null;
+  const finish = () => {
+    if (fired) return;
+    fired = true;
+    if (obs) obs.disconnect();
+    clearTimeout(cap); clearTimeout(quiet);
+    setTimeout(cb, 0);  // not rAF: frames never fire while the window is minimized/hidden
+  };
+  const cap = setTimeout(finish, maxMs);
+  try {
+    obs = new MutationObserver(() => { clearTimeout(quiet); quiet = setTimeout(finish, 50); });
+    obs.observe(node, {childList: true, subtree: true});
+  } catch (e) {}
+}
+"""
+
+# Async: scroll the panel's event list step by step (each step waits for new rows to render,
+# at most pauseMs), checking for the event after each step; resolves with the link, or null
+# at the bottom/timeout
+EVENT_SCROLL_JS = EVENT_FIND_JS + AFTER_SCROLL_JS + """
+const p = arguments[0], spec = arguments[1], maxMs = arguments[2], stepFrac = arguments[3], pauseMs = arguments[4];
+const done = arguments[arguments.length - 1];
+const list = p.querySelector("div.eventList") || p;
+const find = __slcm_event_finder(spec);  // patterns compiled once for the whole scroll
+const t0 = performance.now();
+let seenBottom = false;
+const hit = find(p);
+if (hit) { done(hit); return; }
+(function tick() {
+  if (performance.now() - t0 > maxMs) return done(null);
+  const cliH = list.clientHeight, curH = list.scrollHeight;
+  let newTop = list.scrollTop + (cliH ? Math.max(40, Math.floor(cliH * stepFrac)) : 250);
+  if (curH && newTop >= curH - cliH - 2) { newTop = curH; seenBottom = true; }
+  list.scrollTop = newTop;
+  __slcm_after_scroll(list, pauseMs, () => {
+    const h = find(p);
+    if (h) return done(h);
+    if (seenBottom) return setTimeout(() => done(find(p)), 400);
+    tick();
+  });
+})();
+"""
+
+def scroll_day_panel_gradual(driver, panel, max_seconds, matcher, selected_date):
     seen_bottom = False
+    spec = {"code": matcher.code_up, "sem": matcher.sem_up, "secUp": matcher.sec_up, "sec": [p.pattern for p in matcher.sec_pats],
+            "sess": matcher.sess_up, "y": selected_date.year, "m": selected_date.month, "d": selected_date.day}
+
+    # the whole scroll-and-match loop runs in-page; the Python loop below is the fallback
+    try:
+        prev_script_timeout = driver.timeouts.script
+    except Exception:
+        prev_script_timeout = 30
+    try:
+        driver.set_script_timeout(max_seconds + 5)
+        return driver.execute_async_script(EVENT_SCROLL_JS, panel, spec, int(max_seconds * 1000),
+                                           SCROLL_STEP_FRACTION, int(SCROLL_PAUSE * 1000))
+    except Exception as e:
+        if DEBUG: print("in-page event scroll failed, falling back:", repr(e))
+    finally:
+        try:
+            driver.set_script_timeout(prev_script_timeout)
+        except Exception:
+            pass
+
+    # the fallback gets its own max_seconds; the in-page attempt may have used up the first
+    start = time.time()
+    last_sig = [None]
 
     def collect_candidates():
+        # whole match in one round-trip; the per-link Python path is only a fallback
+        try:
+            hit = driver.execute_script(EVENT_MATCH_JS, panel, spec)
+            return [hit] if hit else []
+        except Exception:
+            pass
+        # fallback: pull (index, text, aria) for every link in one call, match locally,
+        # and resolve only the winner back to a WebElement
+        sel = "a.subject-link, a[data-id='subject-link'], a"
         try:
-            links = driver.execute_script("""
-                const p = arguments[0];
-                return Array.from(p.querySelectorAll("a.subject-link, a[data-id='subject-link'], a"))
-                    .filter(a => (a.innerText||a.textContent||"").trim().length > 0);
-            """, panel)
+            # the aria-description date check runs in-page, so only same-day links come back
+            snap = driver.execute_script("""
+                const y = arguments[2], m = arguments[3], d = arguments[4];
+                const MONTHS = ['january','february','march','april','may','june','july','august','september','october','november','december'];
+                const dateOk = ad => {
+                  const x = ad.replace(/\u2013/g, '-').match(/([A-Za-z]+)\\s+(\\d{1,2})\\s+([A-Za-z]+),\\s*(\\d{4})/);
+                  return !!x && +x[4] === y && +x[2] === d && MONTHS.indexOf(x[3].toLowerCase()) + 1 === m;
+                };
+                const rows = [];
+                Array.from(arguments[0].querySelectorAll(arguments[1])).forEach((a, i) => {
+                  const ad = a.getAttribute('aria-description') || '';
+                  if (!dateOk(ad)) return;
+                  const t = (a.innerText || a.textContent || '').trim();
+                  if (t) rows.push({i: i, t: t, ad: ad});
+                });
+                let h = 5381;
+                for (const r of rows) {
+                  const s = r.t + '\u0001' + r.ad + '\u0002';
+                  for (let k = 0; k < s.length; k++) h = ((h * 33) ^ s.charCodeAt(k)) >>> 0;
+                }
+                return {sig: rows.length + ':' + h, rows: rows};
+            """, panel, sel, selected_date.year, selected_date.month, selected_date.day) or {}
         except Exception:
-            links = panel.find_elements(By.CSS_SELECTOR, "a")
+            snap = {}
+        rows = snap.get("rows") or []
+        # same links as the previous tick (no scroll progress yet): they already failed to match
+        if rows and snap.get("sig") == last_sig[0]:
+            return []
+        last_sig[0] = snap.get("sig")
         out = []
-        for a in links:
+        for r in rows:
+            if not event_text_matches(r['t'], matcher):
+                continue
             try:
-                title = (a.get_attribute("innerText") or a.text or "").strip()
-                if not title or not matches_event_text(title, code, sem, sec, sess):
-                    continue
-                aria = a.get_attribute("aria-description") or ""
-                if aria_date_matches_selected(aria, selected_date):
-                    out.append(a)
+                a = driver.execute_script("return arguments[0].querySelectorAll(arguments[1])[arguments[2]] || null;",
+                                          panel, sel, r['i'])
             except Exception:
-                pass
+                a = None
+            if a is not None:
+                out.append(a)
+                break
         return out
 
     cand = collect_candidates()
@@ -1033,27 +1508,17 @@ def scroll_day_panel_gradual(driver, panel, max_seconds, code, sem, sec, sess, s
         return cand[0]
 
     while time.time() - start < max_seconds:
+        # locate the list, read its metrics and advance scrollTop in one round-trip
         try:
-            list_container = panel.find_element(By.CSS_SELECTOR, "div.eventList")
-        except Exception:
-            list_container = panel
-
-        try:
-            curTop, curH, cliH = driver.execute_script("""
-                const el = arguments[0];
-                return [el.scrollTop, el.scrollHeight, el.clientHeight];
-            """, list_container)
-        except Exception:
-            curTop, curH, cliH = 0, 0, 0
-
-        step = max(40, int(cliH * SCROLL_STEP_FRACTION)) if cliH else 250
-        newTop = curTop + step
-        if curH and newTop >= (curH - cliH - 2):
-            newTop = curH
-            seen_bottom = True
-
-        try:
-            driver.execute_script("arguments[0].scrollTop = arguments[1];", list_container, newTop)
+            seen_bottom = bool(driver.execute_script("""
+                const el = arguments[0].querySelector("div.eventList") || arguments[0];
+                const curH = el.scrollHeight, cliH = el.clientHeight;
+                let newTop = el.scrollTop + (cliH ? Math.max(40, Math.floor(cliH * arguments[1])) : 250);
+                let bottom = false;
+                if (curH && newTop >= curH - cliH - 2) { newTop = curH; bottom = true; }
+                el.scrollTop = newTop;
+                return bottom;
+            """, panel, SCROLL_STEP_FRACTION))
         except Exception:
             pass
 
@@ -1072,32 +1537,276 @@ def scroll_day_panel_gradual(driver, panel, max_seconds, code, sem, sec, sess, s
 
     return None
 
+# __slcm_untick(ids): map rendered id cells to their row's checkbox in one pass and untick each
+# id's checkbox in place (rescanning once if a click re-rendered the table); returns
+# {unticked, already, missing}. Cells and rows are matched the way process_one_absentee does.
+UNTICK_JS = """
+function __slcm_untick(ids) {
+  const want = new Set(ids);
+  const scan = () => {
+    const out = new Map();
+    for (const n of document.querySelectorAll('lightning-base-formatted-text, td, span, [class*="formatted-text"]')) {
+      const txt = (n.textContent || '').split(/\\s+/).filter(Boolean).join(' ');
+      if (!want.has(txt) || out.has(txt)) continue;
+      const row = n.closest('tr, [role="row"]');
+      const cb = row && row.querySelector("input[type='checkbox']");
+      if (cb) out.set(txt, cb);
+    }
+    return out;
+  };
+  let map = scan(), rescanned = false;
+  const res = {unticked: [], already: [], missing: []};
+  for (const id of ids) {
+    let cb = map.get(id);
+    if (cb && !cb.isConnected && !rescanned) { map = scan(); rescanned = true; cb = map.get(id); }
+    if (!cb || !cb.isConnected) { res.missing.push(id); continue; }
+    cb.scrollIntoView({block:'center'});
+    if (cb.checked) { cb.click(); res.unticked.push(id); }
+    else res.already.push(id);
+  }
+  return res;
+}
+"""
+
+# Async: walk the (virtualized) table container once from the top, unticking ids as their rows
+# render; resolves with {found: {id: true/false}, complete: reached the bottom or found them all}
+TABLE_SWEEP_JS = UNTICK_JS + AFTER_SCROLL_JS + """
+const cont = arguments[0], pauseMs = arguments[2], maxMs = arguments[3];
+const done = arguments[arguments.length - 1];
+const found = {};
+let remaining = arguments[1].slice();
+const t0 = performance.now();
+cont.scrollTop = 0;
+(function step() {
+  __slcm_after_scroll(cont, pauseMs, () => {
+    const res = __slcm_untick(remaining);
+    for (const id of res.unticked) if (!(id in found)) found[id] = true;
+    for (const id of res.already) if (!(id in found)) found[id] = false;
+    remaining = remaining.filter(id => !(id in found));
+    if (!remaining.length || cont.scrollTop + cont.clientHeight >= cont.scrollHeight - 2)
+      return done({found: found, complete: true});
+    if (performance.now() - t0 > maxMs) return done({found: found, complete: false});
+    cont.scrollTop = Math.min(cont.scrollTop + Math.max(80, cont.clientHeight * 0.35), cont.scrollHeight);
+    step();
+  });
+})();
+"""
+
 # =========================================================
-# Main
+# Driver lifecycle (one Chrome session per process, reused by get_driver)
 # =========================================================
-def main():
-    print("🚀 SLCM Attendance Automation Started")
-    print("====================================================")
+_driver = None
+_temp_profile_dir = None
+_chromedriver_path = None
+_attached = False
+
+def pick_profile_dir():
+    home = Path.home()
+    d1 = home / ".slcm_automation_profile"
+    try:
+        d1.mkdir(parents=True, exist_ok=True)
+        return str(d1)
+    except Exception:
+        pass
+    d2 = Path(tempfile.gettempdir()) / f"slcm_automation_profile_{os.getuid() if hasattr(os, 'getuid') else 'user'}"
+    d2.mkdir(parents=True, exist_ok=True)
+    return str(d2)
+
+# Shared by the chromedriver launch and the detached --attach Chrome; the in-page polling loops
+# rely on timers not being throttled while Chrome sits behind Excel
+CHROME_ARGS = (
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--log-level=3",
+    "--disable-logging",
+    "--disable-dev-shm-usage",
+    "--no-sandbox",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-features=TranslateUI,VizDisplayCompositor",
+)
+
+def build_options(user_data_dir, attach=False):
+    opts = webdriver.ChromeOptions()
+    if attach:
+        # the browser was started by ensure_debug_chrome with CHROME_ARGS; only the DevTools address applies
+        opts.debugger_address = f"127.0.0.1:{ATTACH_PORT}"
+    else:
+        opts.add_argument(f"--user-data-dir={user_data_dir}")
+        for arg in CHROME_ARGS:
+            opts.add_argument(arg)
+    # implicit wait 0 from session creation: only the explicit WebDriverWaits bound lookups
+    try: opts.timeouts = {"implicit": 0}
+    except Exception: pass
+    return opts
+
+def chrome_binary():
+    for name in ("chrome", "google-chrome", "google-chrome-stable", "chromium", "chromium-browser"):
+        p = shutil.which(name)
+        if p:
+            return p
+    for p in (os.path.expandvars(r"%ProgramFiles%\Google\Chrome\Application\chrome.exe"),
+              os.path.expandvars(r"%ProgramFiles(x86)%\Google\Chrome\Application\chrome.exe"),
+              os.path.expandvars(r"%LOCALAPPDATA%\Google\Chrome\Application\chrome.exe"),
+              "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"):
+        if os.path.isfile(p):
+            return p
+    return None
 
-    selected_date_str, workbook_path, absentees_str, subject_details_str = parse_arguments()
+def debug_port_open(port=ATTACH_PORT):
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.3):
+            return True
+    except OSError:
+        return False
 
+def ensure_debug_chrome(profile_dir):
+    # start a detached Chrome with a DevTools port, unless one from an earlier run is still up
+    if debug_port_open():
+        return True
+    exe = chrome_binary()
+    if not exe:
+        return False
+    kw = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    if sys.platform == "win32":
+        kw["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kw["start_new_session"] = True
+    subprocess.Popen([exe, f"--remote-debugging-port={ATTACH_PORT}", f"--user-data-dir={profile_dir}",
+                      *CHROME_ARGS], **kw)
+    t0 = time.time()
+    while time.time() - t0 < 15:
+        if debug_port_open():
+            return True
+        time.sleep(0.2)
+    return False
+
+def chromedriver_path(refresh=False):
+    # ChromeDriverManager().install() reads its cache (and may hit the network) on every call;
+    # remember the resolved binary in memory and in the profile dir between runs
+    global _chromedriver_path
+    cache = Path(pick_profile_dir()) / "driver_path.txt"
+    if not refresh:
+        if _chromedriver_path:
+            return _chromedriver_path
+        try:
+            if time.time() - cache.stat().st_mtime < DRIVER_PATH_MAX_AGE:
+                p = cache.read_text(encoding="utf-8").strip()
+                if p and os.path.isfile(p):
+                    _chromedriver_path = p
+                    return p
+        except Exception:
+            pass
+    _chromedriver_path = ChromeDriverManager().install()
+    try: cache.write_text(_chromedriver_path, encoding="utf-8")
+    except Exception: pass
+    return _chromedriver_path
+
+def get_driver(attach=False):
+    global _driver, _temp_profile_dir, _attached
+    if _driver is not None:
+        return _driver
+    load_selenium()
+
+    profile_dir = pick_profile_dir()
+    print(f"👤 Using Chrome profile dir: {profile_dir}")
+
+    # a Chrome kept alive by an earlier --attach run owns the profile: leave its lock files alone
+    if not (attach and debug_port_open()):
+        with os.scandir(profile_dir) as it:
+            for e in it:
+                if e.name.startswith("Singleton"):
+                    try: os.unlink(e.path)
+                    except OSError: pass
+
+    if attach:
+        try:
+            if not ensure_debug_chrome(profile_dir):
+                raise RuntimeError("Chrome binary not found or DevTools port never opened")
+            _driver = webdriver.Chrome(service=Service(chromedriver_path()), options=build_options(profile_dir, attach=True))
+            _attached = True
+            print(f"🔗 Attached to Chrome on port {ATTACH_PORT}")
+        except Exception as e:
+            print(f"⚠️ Could not attach to Chrome ({e}). Launching a new session…")
+
+    if _driver is None:
+        options = build_options(profile_dir)
+        try:
+            _driver = webdriver.Chrome(service=Service(chromedriver_path()), options=options)
+        except SessionNotCreatedException:
+            # a cached driver can fall behind a Chrome auto-update; resolve a fresh one and keep
+            # the real profile (and its SSO login) before assuming the profile is locked
+            try:
+                _driver = webdriver.Chrome(service=Service(chromedriver_path(refresh=True)), options=options)
+            except SessionNotCreatedException:
+                print("⚠️ Profile is locked. Using fresh temp profile…")
+                _temp_profile_dir = tempfile.mkdtemp(prefix="slcm_profile_")
+                _driver = webdriver.Chrome(service=Service(chromedriver_path()),
+                                           options=build_options(_temp_profile_dir))
+
+    # explicit WebDriverWaits only; an implicit wait would stack on every missed probe
+    _driver.implicitly_wait(0)
+    install_page_helpers(_driver)
+    return _driver
+
+def quit_driver():
+    global _driver, _temp_profile_dir, _attached
+    if _driver is not None:
+        if _attached:
+            # keep the shared browser for the next run; only stop this run's chromedriver
+            try: _driver.service.stop()
+            except Exception: pass
+        else:
+            try: _driver.quit()
+            except Exception: pass
+        _driver = None
+        _attached = False
+    if _temp_profile_dir:
+        try: shutil.rmtree(_temp_profile_dir, ignore_errors=True)
+        except Exception: pass
+        _temp_profile_dir = None
+
+atexit.register(quit_driver)
+
+# =========================================================
+# Main
+# =========================================================
+# One attendance submission. Returns None for bad input (nothing was opened), otherwise
+# True/False for whether the automation ran to the end. The browser is left open for reuse.
+def run_session(selected_date_str, workbook_path, absentees_str, subject_details_str, attach=False):
     selected_date = parse_date_any(selected_date_str)
     if not selected_date:
         print(f"❌ Could not parse date: {selected_date_str}")
-        sys.exit(1)
+        return None
+    wanted_headers = day_header_set(selected_date)
 
-    absentees = [s.strip() for s in (absentees_str or "").split(",") if s.strip()]
+    # one entry per student (case-insensitive); malformed ids are reported instead of searched for
+    absentees, rejected, seen = [], [], set()
+    for sid in (absentees_str or "").split(","):
+        sid = sid.strip()
+        if not sid or sid.upper() in seen:
+            continue
+        seen.add(sid.upper())
+        if _STUDENT_ID_RE.match(sid):
+            absentees.append(sid)
+        else:
+            rejected.append(sid)
 
     parsed, err = parse_subject_details(subject_details_str)
     if err:
         print(f"❌ Invalid subject details: {err}")
         print(f"   Received: {subject_details_str!r}")
-        sys.exit(1)
+        return None
     course_name, course_code, semester, class_section, session_no = parsed
+    matcher = build_matcher_spec(course_code, semester, class_section,
+                                 session_no if "-" not in class_section.strip() else None)
 
     print(f"📅 Selected Date : {selected_date}")
     print(f"📂 Workbook      : {workbook_path}")
     print(f"🧑‍🎓 Absentees   : {', '.join(absentees) if absentees else 'None'}")
+    if rejected:
+        print(f"⚠️ Ignoring malformed ids: {', '.join(rejected)}")
     print("\n📘 Course Details")
     print(f"   Course Name   : {course_name or '(blank)'}")
     print(f"   Course Code   : {course_code or '(blank)'}")
@@ -1105,58 +1814,7 @@ def main():
     print(f"   Class Section : {class_section or '(blank)'}")
     print(f"   Session No    : {session_no or '(none)'}")
 
-    # ---- Selenium profile ----
-    from pathlib import Path
-    def pick_profile_dir():
-        home = Path.home()
-        d1 = home / ".slcm_automation_profile"
-        try:
-            d1.mkdir(parents=True, exist_ok=True)
-            return str(d1)
-        except Exception:
-            pass
-        d2 = Path(tempfile.gettempdir()) / f"slcm_automation_profile_{os.getuid() if hasattr(os, 'getuid') else 'user'}"
-        d2.mkdir(parents=True, exist_ok=True)
-        return str(d2)
-
-    PROFILE_DIR = pick_profile_dir()
-    print(f"👤 Using Chrome profile dir: {PROFILE_DIR}")
-
-    for name in os.listdir(PROFILE_DIR):
-        if name.startswith("Singleton"):
-            try: os.remove(os.path.join(PROFILE_DIR, name))
-            except Exception: pass
-
-    TEMP_PROFILE_DIR = None
-    def build_options(user_data_dir):
-        opts = webdriver.ChromeOptions()
-        opts.add_argument(f"--user-data-dir={user_data_dir}")
-        opts.add_argument("--no-first-run")
-        opts.add_argument("--no-default-browser-check")
-        opts.add_argument("--log-level=3")
-        opts.add_argument("--disable-logging")
-        opts.add_argument("--disable-dev-shm-usage")
-        opts.add_argument("--no-sandbox")
-        opts.add_argument("--disable-background-timer-throttling")
-        opts.add_argument("--disable-backgrounding-occluded-windows")
-        opts.add_argument("--disable-renderer-backgrounding")
-        opts.add_argument("--disable-features=TranslateUI,VizDisplayCompositor")
-        return opts
-
-    def start_driver_with_fallback():
-        nonlocal TEMP_PROFILE_DIR
-        try:
-            options = build_options(PROFILE_DIR)
-            service = Service(ChromeDriverManager().install())
-            return webdriver.Chrome(service=service, options=options)
-        except SessionNotCreatedException:
-            print("⚠️ Profile is locked. Using fresh temp profile…")
-            TEMP_PROFILE_DIR = tempfile.mkdtemp(prefix="slcm_profile_")
-            options = build_options(TEMP_PROFILE_DIR)
-            service = Service(ChromeDriverManager().install())
-            return webdriver.Chrome(service=service, options=options)
-
-    driver = start_driver_with_fallback()
+    driver = get_driver(attach=attach)
 
     try:
         # Navigate & login
@@ -1183,11 +1841,16 @@ def main():
 
         # Wait for mini calendar & click selected date (robust with fallbacks)
         WebDriverWait(driver, 12).until(EC.presence_of_element_located((By.ID, "calendarSidebar")))
-        time.sleep(0.25)
+        # the sidebar shell renders before its day grid; wait for cells rather than a fixed pause
+        try:
+            WebDriverWait(driver, 2, poll_frequency=0.05).until(lambda d: d.execute_script(
+                SIDEBAR_WRAP_JS + "const w = __slcm_wrap(); return !!(w && w.querySelector('td, [data-date]'));"))
+        except Exception:
+            pass
         day_number = str(selected_date.day).lstrip("0")
 
         def try_wait_panel(timeout=PANEL_READY_TIMEOUT):
-            p = wait_for_day_panel_ready(driver, selected_date, timeout=timeout)
+            p = wait_for_day_panel_ready(driver, wanted_headers, timeout=timeout)
             if p:
                 if DEBUG: print("wait_for_day_panel_ready: panel found")
             else:
@@ -1202,7 +1865,7 @@ def main():
             if DEBUG:
                 print("click_calendar_date_fast raised:", repr(e_fast))
 
-        time.sleep(AFTER_DATE_CLICK_PAUSE)
+        wait_after_date_click(driver)
         panel = try_wait_panel(timeout=PANEL_READY_TIMEOUT)
 
         # Fallback 1: use the robust navigation+click method and wait again
@@ -1211,7 +1874,7 @@ def main():
                 if DEBUG: print("Fallback: click_calendar_date_robust(...)")
                 ok = click_calendar_date_robust(driver, selected_date)
                 if ok:
-                    time.sleep(AFTER_DATE_CLICK_PAUSE)
+                    wait_after_date_click(driver)
                 panel = try_wait_panel(timeout=PANEL_READY_TIMEOUT)
             except Exception as e_rob:
                 if DEBUG: print("click_calendar_date_robust raised:", repr(e_rob))
@@ -1238,7 +1901,7 @@ def main():
                     return true;
                 """, target_dd)
                 if DEBUG: print("Fallback data-date click returned:", bool(clicked))
-                time.sleep(AFTER_DATE_CLICK_PAUSE)
+                wait_after_date_click(driver)
                 panel = try_wait_panel(timeout=PANEL_READY_TIMEOUT)
             except Exception as e:
                 if DEBUG: print("data-date fallback raised:", repr(e))
@@ -1248,16 +1911,16 @@ def main():
         if not panel:
             try:
                 if DEBUG: print("Fallback: clicking visible non-disabled cell inside calendarSidebar with day text")
-                clicked = driver.execute_script("""
+                clicked = driver.execute_script(SIDEBAR_WRAP_JS + """
                     const day = arguments[0].trim();
-                    const wrap = document.querySelector('#calendarSidebar') || document.querySelector('.calendarSidebar');
+                    const wrap = __slcm_wrap();
                     if (!wrap) return false;
                     const cells = Array.from(wrap.querySelectorAll('td, button, a, div, span'));
                     for (const c of cells) {
                         try {
-                            const txt = (c.innerText || c.textContent || '').trim();
+                            const txt = (c.textContent || '').trim();
                             const cls = (c.className||'').toLowerCase();
-                            const disabled = cls.includes('disabled') || cls.includes('prevmonth') || cls.includes('nextmonth') || (c.getAttribute && c.getAttribute('aria-disabled') === 'true');
+                            const disabled = /disabled|prevmonth|nextmonth/.test(cls) || (c.getAttribute && c.getAttribute('aria-disabled') === 'true');
                             if (!disabled && txt === day) {
                                 c.scrollIntoView({block:'center'});
                                 try { c.click(); } catch(e) { c.dispatchEvent(new MouseEvent('click',{bubbles:true})); }
@@ -1268,7 +1931,7 @@ def main():
                     return false;
                 """, day_number)
                 if DEBUG: print("Sidebar visible-day click returned:", bool(clicked))
-                time.sleep(AFTER_DATE_CLICK_PAUSE)
+                wait_after_date_click(driver)
                 panel = try_wait_panel(timeout=PANEL_READY_TIMEOUT)
             except Exception as e:
                 if DEBUG: print("sidebar fallback raised:", repr(e))
@@ -1277,8 +1940,8 @@ def main():
         # Final diagnostic dump and error if still not found
         if not panel:
             try:
-                data_dates = driver.execute_script("""
-                    const wrap = document.querySelector('#calendarSidebar') || document.querySelector('.calendarSidebar');
+                data_dates = driver.execute_script(SIDEBAR_WRAP_JS + """
+                    const wrap = __slcm_wrap();
                     if (!wrap) return [];
                     const nodes = Array.from(wrap.querySelectorAll('[data-date]'));
                     const out = [];
@@ -1310,33 +1973,35 @@ def main():
         # find event tile and open it
         target = scroll_day_panel_gradual(
             driver, panel, max_seconds=EVENT_SEARCH_TIMEOUT,
-            code=course_code, sem=semester, sec=class_section,
-            sess=(session_no if "-" not in class_section.strip() else None),
-            selected_date=selected_date
+            matcher=matcher, selected_date=selected_date
         )
         if not target:
             raise RuntimeError("❌ Could not locate the event tile for the selected date (after scrolling & waiting).")
 
         try:
             driver.execute_script("arguments[0].scrollIntoView({block:'center'});", target)
-            time.sleep(0.12)
+            try:
+                WebDriverWait(driver, 2, poll_frequency=0.05).until(EC.element_to_be_clickable(target))
+            except TimeoutException:
+                pass
             target.click()
             print("✅ Opened the event tile")
         except Exception as e:
             raise RuntimeError(f"❌ Failed to click the event tile: {e}")
 
-        # "More Details" if present
+        # "More Details" if present; stop waiting as soon as the Attendance tab is already there
         try:
-            more_details = WebDriverWait(driver, 8).until(
-                EC.element_to_be_clickable((By.XPATH, "//a[normalize-space()='More Details']"))
-            )
-            js_click(driver, more_details)
-            print("✅ Clicked 'More Details'")
+            found = WebDriverWait(driver, 8, poll_frequency=0.1).until(EC.any_of(
+                EC.element_to_be_clickable((By.XPATH, "//a[normalize-space()='More Details']")),
+                EC.presence_of_element_located((By.CSS_SELECTOR, "a[data-label='Attendance']")),
+            ))
+            if found.get_attribute("data-label") != "Attendance":
+                js_click(driver, found)
+                print("✅ Clicked 'More Details'")
         except Exception:
             pass
 
         # Attendance tab
-        time.sleep(0.6)
         def click_attendance_tab_fast(driver):
             js = """
             let el = document.querySelector("a[data-label='Attendance']");
@@ -1348,9 +2013,13 @@ def main():
             if (el) { el.scrollIntoView({block:'center'}); el.click(); return true; }
             return false;
             """
-            if driver.execute_script(js):
+            # poll the JS probe while the record page renders (replaces a fixed pause)
+            try:
+                WebDriverWait(driver, 3, poll_frequency=0.1).until(lambda d: d.execute_script(js))
                 print("✅ Opened Attendance tab (fast)")
                 return True
+            except Exception:
+                pass
             try:
                 att_tab = WebDriverWait(driver, 10).until(
                     EC.element_to_be_clickable((By.XPATH, "//a[@data-label='Attendance'] | //span[@class='title' and normalize-space()='Attendance']"))
@@ -1370,43 +2039,70 @@ def main():
         # =============================
         print(f"🔎 Processing attendance for {len(absentees)} absentees…")
         unticked_ids, not_found = [], []
+        if absentees:
+            try:
+                WebDriverWait(driver, 10, poll_frequency=0.1).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='checkbox']"))
+                )
+            except TimeoutException:
+                pass
+
+        # resolved once per attendance page; callers pass refresh=True after a stale reference
+        table_cont = {"el": None}
 
-        def get_table_container():
+        def get_table_container(refresh=False):
+            if table_cont["el"] is not None and not refresh:
+                return table_cont["el"]
             try:
-                return WebDriverWait(driver, 4).until(
+                el = WebDriverWait(driver, 4).until(
                     EC.presence_of_element_located((By.XPATH, "//div[contains(@class,'slds-table') or contains(@class,'slds-scrollable')]//table/ancestor::div[contains(@class,'scroll') or contains(@class,'slds-scrollable')][1]"))
                 )
             except Exception:
                 try:
-                    return driver.find_element(By.XPATH, "//div[contains(@class,'slds-scrollable')]")
+                    el = driver.find_element(By.XPATH, "//div[contains(@class,'slds-scrollable')]")
                 except Exception:
-                    return None
+                    el = None
+            table_cont["el"] = el
+            return el
 
         def try_find_cell_for_id(student_id):
-            xps = [
-                f"//lightning-base-formatted-text[normalize-space()='{student_id}']",
-                f"//td[normalize-space()='{student_id}']",
-                f"//*[contains(@class,'formatted-text') and normalize-space()='{student_id}']",
-            ]
-            for xp in xps:
-                try:
-                    return WebDriverWait(driver, SHORT_FIND_TIMEOUT).until(
-                        EC.presence_of_element_located((By.XPATH, xp))
-                    )
-                except TimeoutException:
-                    continue
-                except StaleElementReferenceException:
-                    continue
+            # one union XPath, one wait (instead of three serial waits)
+            xp = (f"//lightning-base-formatted-text[normalize-space()='{student_id}']"
+                  f" | //td[normalize-space()='{student_id}']"
+                  f" | //*[contains(@class,'formatted-text') and normalize-space()='{student_id}']")
+            # Once the table has rendered cells, polling won't make a missing id appear
+            try:
+                wait_s = 0 if cdp_query_all(driver, "lightning-base-formatted-text, td") else SHORT_FIND_TIMEOUT
+            except Exception:
+                wait_s = SHORT_FIND_TIMEOUT
+            try:
+                return WebDriverWait(driver, wait_s, poll_frequency=0.1).until(
+                    EC.presence_of_element_located((By.XPATH, xp))
+                )
+            except (TimeoutException, StaleElementReferenceException):
+                pass
 
+            # text -> first cell map, built by one DOM walk and kept on the page until the table scrolls
+            # (or a lookup misses, since rows can render after the last build)
             try:
                 cell = driver.execute_script("""
                     const sid = arguments[0].trim();
-                    const nodes = Array.from(document.querySelectorAll("lightning-base-formatted-text, td, span"));
-                    for (const n of nodes) {
-                      const txt = (n.innerText || n.textContent || "").trim();
-                      if (txt === sid) return n;
+                    const build = () => {
+                      const m = new Map();
+                      for (const n of document.querySelectorAll("lightning-base-formatted-text, td, span")) {
+                        const txt = (n.innerText || n.textContent || "").trim();
+                        if (txt && !m.has(txt)) m.set(txt, n);
+                      }
+                      return window.__slcmCellMap = m;
+                    };
+                    const map = window.__slcmCellMap;
+                    if (map) {
+                      const cached = map.get(sid);
+                      if (cached && cached.isConnected) return cached;
                     }
-                    return null;
+                    // stale hit or miss: rebuild once
+                    const hit = build().get(sid);
+                    return hit && hit.isConnected ? hit : null;
                 """, student_id)
                 if cell:
                     return cell
@@ -1417,7 +2113,7 @@ def main():
 
         def find_checkbox_from_cell(cell):
             try:
-                row = cell.find_element(By.XPATH, "./ancestor::tr")
+                row = cell.find_element(By.XPATH, "./ancestor::*[self::tr or @role='row'][1]")
                 return row.find_element(By.XPATH, ".//input[@type='checkbox']")
             except Exception:
                 return None
@@ -1427,11 +2123,18 @@ def main():
             if not cont:
                 return
             try:
+                driver.execute_script("window.__slcmCellMap = null;")
                 for _ in range(TABLE_SCROLL_TRIES):
-                    driver.execute_script(
-                        "arguments[0].scrollTop = Math.min(arguments[0].scrollTop + Math.max(80, arguments[0].clientHeight*0.35), arguments[0].scrollHeight);",
-                        cont
-                    )
+                    try:
+                        driver.execute_script(
+                            "arguments[0].scrollTop = Math.min(arguments[0].scrollTop + Math.max(80, arguments[0].clientHeight*0.35), arguments[0].scrollHeight);",
+                            cont
+                        )
+                    except StaleElementReferenceException:
+                        cont = get_table_container(refresh=True)
+                        if not cont:
+                            return
+                        continue
                     time.sleep(TABLE_SCROLL_PAUSE)
             except Exception:
                 pass
@@ -1462,8 +2165,56 @@ def main():
                     continue
             return None
 
+        def untick_absentees(ids):
+            try:
+                return driver.execute_script(UNTICK_JS + "return __slcm_untick(arguments[0]);", ids)
+            except Exception:
+                return None
+
+        def sweep_table_for(ids):
+            # returns ({id: True/False} for the ids seen, reached_bottom), or (None, False) if it couldn't run
+            cont = get_table_container()
+            if not cont:
+                return None, False
+            try:
+                prev_script_timeout = driver.timeouts.script
+            except Exception:
+                prev_script_timeout = 30
+            try:
+                driver.set_script_timeout(TABLE_SWEEP_TIMEOUT + 5)
+                res = driver.execute_async_script(TABLE_SWEEP_JS, cont, ids, int(TABLE_SCROLL_PAUSE * 1000),
+                                                  TABLE_SWEEP_TIMEOUT * 1000) or {}
+                return res.get("found") or {}, bool(res.get("complete"))
+            except Exception as e:
+                if DEBUG: print("table sweep failed:", repr(e))
+                return None, False
+            finally:
+                try:
+                    driver.set_script_timeout(prev_script_timeout)
+                except Exception:
+                    pass
+
+        batch = untick_absentees(absentees) or {}
+        batch_unticked, batch_already = set(batch.get("unticked") or ()), set(batch.get("already") or ())
+
+        # rows not rendered yet (virtualized table): sweep once for all of them
+        missing = [ab for ab in absentees if ab not in batch_unticked and ab not in batch_already]
+        swept, sweep_complete = None, False
+        if missing:
+            swept, sweep_complete = sweep_table_for(missing)
+            if DEBUG: print("table sweep:", swept, "complete" if sweep_complete else "incomplete")
+
         for ab in absentees:
-            result = process_one_absentee(ab)
+            if ab in batch_unticked:
+                result = True
+            elif ab in batch_already:
+                result = False
+            elif swept is not None and (ab in swept or sweep_complete):
+                # a sweep that reached the bottom saw every row; unseen ids aren't on the page
+                result = swept.get(ab)
+            else:
+                # the sweep couldn't run or timed out first -> per-student scroll-and-search path
+                result = process_one_absentee(ab)
             if result is True:
                 print(f"✔️ Unticked: {ab}")
                 unticked_ids.append(ab)
@@ -1489,66 +2240,119 @@ def main():
             js_click(driver, submit_btn)
             print("✅ Clicked Submit Attendance")
 
-            modal = WebDriverWait(driver, 22).until(
-                EC.presence_of_element_located((By.XPATH, "//div[contains(@class,'modal-container') or contains(@class,'uiModal') or contains(@class,'slds-modal')]"))
+            # visibility_of_element_located covers presence too: one polling loop, not two
+            modal = WebDriverWait(driver, 22, poll_frequency=0.1).until(
+                EC.visibility_of_element_located((By.XPATH, "//div[contains(@class,'modal-container') or contains(@class,'uiModal') or contains(@class,'slds-modal')]"))
             )
-            WebDriverWait(driver, 12).until(EC.visibility_of(modal))
             print("✅ Confirmation modal visible")
 
-            xps = [
-                ".//button[normalize-space()='Confirm Submission']",
-                ".//button[.//span[normalize-space()='Confirm Submission']]",
-                ".//button[contains(.,'Confirm Submission')]",
-                ".//footer//*[self::button or self::*[contains(@class,'slds-button')]][contains(.,'Confirm') and contains(@class,'slds-button_brand')]",
-                ".//button[contains(.,'Confirm') and contains(@class,'slds-button_brand')]",
-            ]
+            # one JS probe over the modal's buttons, polled briefly while it renders:
+            # a "Confirm Submission" button first, else a brand (primary) button mentioning Confirm
+            confirm_js = """
+                const modal = (arguments[0] && arguments[0].isConnected && arguments[0])
+                              || document.querySelector('.modal-container, .uiModal, .slds-modal');
+                if (!modal) return null;
+                // skip disabled/hidden buttons so the wait keeps polling until Confirm is usable
+                const btns = Array.from(modal.querySelectorAll('button, .slds-button'))
+                                  .filter(b => !b.disabled && b.offsetParent !== null);
+                const norm = t => (t || '').trim().toLowerCase();
+                return btns.find(b => {
+                  const txt = norm(b.innerText || b.textContent);
+                  return txt === 'confirm submission' || txt === 'confirm' || txt.includes('confirm submission');
+                }) || btns.find(b => b.classList.contains('slds-button_brand')
+                                 && norm(b.innerText || b.textContent).includes('confirm')) || null;
+            """
+            try:
+                btn = WebDriverWait(driver, 8, poll_frequency=0.2).until(lambda d: d.execute_script(confirm_js, modal))
+            except Exception:
+                btn = None
             clicked = False
-            for xp in xps:
+            if btn:
                 try:
-                    btn = WebDriverWait(modal, 8).until(EC.element_to_be_clickable((By.XPATH, xp)))
                     js_click(driver, btn)
                     print("✅ Confirmed submission")
                     clicked = True
-                    break
                 except Exception:
-                    continue
+                    pass
+
             if not clicked:
-                btn = driver.execute_script("""
-                    const modal = document.querySelector('.modal-container, .uiModal, .slds-modal');
-                    if (!modal) return null;
-                    const btns = Array.from(modal.querySelectorAll('button, .slds-button'));
-                    const norm = t => (t || '').trim().toLowerCase();
-                    return btns.find(b => {
-                      const txt = norm(b.innerText || b.textContent);
-                      return txt === 'confirm submission' || txt === 'confirm' || txt.includes('confirm submission');
-                    }) || null;
-                """)
-                if btn:
-                    driver.execute_script("arguments[0].click();", btn)
-                    print("✅ Confirmed via JS fallback")
-                else:
-                    try:
-                        modal.send_keys(Keys.ENTER)
-                        print("↩️ Sent ENTER to modal (fallback)")
-                    except Exception:
-                        print("⚠️ Please click Confirm manually.")
+                try:
+                    modal.send_keys(Keys.ENTER)
+                    print("↩️ Sent ENTER to modal (fallback)")
+                except Exception:
+                    print("⚠️ Please click Confirm manually.")
 
         except Exception as e:
             print(f"⚠️ Could not submit attendance: {e}")
 
         print("\n🎉 SLCM Attendance automation completed!")
-        time.sleep(1.3)
+        # let the confirmation modal close (the submit request is in flight) before quitting
+        try:
+            WebDriverWait(driver, 5, poll_frequency=0.1).until(EC.invisibility_of_element_located(
+                (By.XPATH, "//div[contains(@class,'modal-container') or contains(@class,'uiModal') or contains(@class,'slds-modal')]")))
+        except Exception:
+            pass
+        return True
 
     except Exception as e:
         print(f"❌ Error during automation: {e}")
         import traceback; traceback.print_exc()
+        return False
 
-    finally:
-        try: driver.quit()
-        except Exception: pass
-        if 'TEMP_PROFILE_DIR' in locals() and TEMP_PROFILE_DIR:
-            try: shutil.rmtree(TEMP_PROFILE_DIR, ignore_errors=True)
-            except Exception: pass
+# --daemon: serve one JSON request per stdin line, reusing the browser (and its login) between them:
+#   {"date": "8/1/2025", "workbook": "...", "absentees": "230905016,230905064", "subject": "..."}
+# Each request ends with a {"done": true, "ok": ...} line on stdout; EOF or "quit" stops the loop.
+# SSO / manual-step prompts read their Enter from the same stdin, so answer them with an empty line.
+def serve_stdin(attach=False):
+    print("🛰️ Daemon mode: waiting for JSON requests on stdin")
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        if line.lower() in ("quit", "exit"):
+            break
+        try:
+            req = json.loads(line)
+            args = (str(req["date"]), str(req.get("workbook") or ""), str(req.get("absentees") or ""), str(req["subject"]))
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"❌ Bad request ({e!r}): {line!r}")
+            print(json.dumps({"done": True, "ok": False, "error": "bad request"}), flush=True)
+            continue
+        # a browser closed since the last request leaves a dead session behind; start over
+        if _driver is not None:
+            try: _driver.current_url
+            except Exception: quit_driver()
+        try:
+            ok = run_session(*args, attach=attach)
+        except Exception as e:
+            # driver startup (selenium import, chromedriver, session creation) runs outside
+            # run_session's own guard; report it and keep serving
+            print(f"❌ Session failed to start: {e}")
+            quit_driver()
+            print(json.dumps({"done": True, "ok": False, "error": str(e) or repr(e)}), flush=True)
+            continue
+        print(json.dumps({"done": True, "ok": bool(ok)}), flush=True)
+
+def main():
+    print("🚀 SLCM Attendance Automation Started")
+    print("====================================================")
+
+    if "--daemon" in sys.argv[1:]:
+        try:
+            serve_stdin(attach=attach_requested())
+        finally:
+            quit_driver()
+    else:
+        selected_date_str, workbook_path, absentees_str, subject_details_str, attach = parse_arguments()
+        try:
+            ok = run_session(selected_date_str, workbook_path, absentees_str, subject_details_str, attach=attach)
+        finally:
+            quit_driver()
+        if ok is None:
+            sys.exit(1)
 
     print("\n====================================================")
     print("👨‍💻 Developed by: Anirudhan Adukkathayar C, SCE, MIT")